@@ -0,0 +1,314 @@
+"""
+Bulk loader for the inventory_sales ledger.
+
+    python bulk_load.py                                  # ../data/inventory_sales.csv
+    python bulk_load.py big.csv --workers 8 --chunk-rows 500000
+    python bulk_load.py history.parquet                  # needs pyarrow
+
+The input is streamed in chunks through Postgres COPY into a staging table,
+several chunks at a time over separate connections. Indexes and constraints
+are built once the rows are in, then the staging table is swapped in for
+inventory_sales and sku_catalog is rebuilt, all in one short transaction.
+The staging table is partitioned by month like inventory_sales: partitions
+covering the current ledger's months are made up front, rows for months
+only the file has go to a DEFAULT partition, which is split into monthly
+partitions and dropped after the COPY.
+The daily/weekly/monthly rollups are built from the staging table into
+their own staging tables and swapped in along with it. Readers keep seeing
+the old ledger until the swap and the old tables are dropped whole, so
+nothing is left behind to vacuum.
+
+Row IDs are assigned here in file order (as to_sql did), so the latest-row
+rule used by sku_catalog is unaffected by chunks finishing out of order.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend_api"))
+from migrations import apply_migrations, REBUILD_SKU_CATALOG  # noqa: E402
+from partitions import (  # noqa: E402
+    PARTITION_AHEAD_MONTHS,
+    add_months,
+    ensure_partitions,
+    list_partitions,
+    partitioned_table_statements,
+)
+from rollups import ROLLUP_TABLES, build_rollup_statements  # noqa: E402
+
+DATA_PATH = "../data/inventory_sales.csv"
+STAGING_TABLE = "inventory_sales_load"
+# Appended to each rollup table's name for its staging copy
+STAGING_SUFFIX = "_load"
+
+REQUIRED_COLUMNS = ["sku_id", "sku_name", "sale_date", "sales_qty"]
+OPTIONAL_COLUMNS = ["purchase_qty", "stock_level"]
+
+# Mirrors migration 7; built on the staging table (and so every partition) after COPY
+STAGING_DDL = [
+    f"ALTER TABLE {STAGING_TABLE} ADD CONSTRAINT {STAGING_TABLE}_pkey PRIMARY KEY (id, sale_date)",
+    f"""
+    CREATE INDEX ix_{STAGING_TABLE}_sku_date_id
+    ON {STAGING_TABLE} (sku_id, sale_date, id)
+    INCLUDE (sales_qty, purchase_qty, stock_level)
+    """,
+    f"""
+    ALTER TABLE {STAGING_TABLE}
+        ADD CONSTRAINT ck_inventory_sales_sales_qty CHECK (sales_qty >= 0),
+        ADD CONSTRAINT ck_inventory_sales_purchase_qty CHECK (purchase_qty >= 0),
+        ADD CONSTRAINT ck_inventory_sales_stock_level CHECK (stock_level >= 0)
+    """,
+]
+
+
+def _rollup_swap_statements() -> list[str]:
+    statements = []
+    for table in ROLLUP_TABLES.values():
+        staging = table + STAGING_SUFFIX
+        statements += [
+            f"DROP TABLE {table}",
+            f"ALTER TABLE {staging} RENAME TO {table}",
+            f"ALTER TABLE {table} RENAME CONSTRAINT {staging}_pkey TO {table}_pkey",
+        ]
+    return statements
+
+
+def _drop_staging_statements() -> list[str]:
+    return [f"DROP TABLE IF EXISTS {t}" for t in [STAGING_TABLE, *(r + STAGING_SUFFIX for r in ROLLUP_TABLES.values())]]
+
+
+def _partition_renames(conn) -> list[str]:
+    """Rename the staging partitions and their indexes for inventory_sales
+    (inventory_sales_load_p202401 -> inventory_sales_p202401)."""
+    indexes = conn.execute(text("""
+        SELECT ic.relname
+        FROM pg_inherits h
+        JOIN pg_index x ON x.indrelid = h.inhrelid
+        JOIN pg_class ic ON ic.oid = x.indexrelid
+        WHERE h.inhparent = CAST(:parent AS regclass)
+    """), {"parent": STAGING_TABLE}).scalars().all()
+    partitions = [p["name"] for p in list_partitions(conn, STAGING_TABLE)]
+    return [
+        *(f"ALTER TABLE {p} RENAME TO inventory_sales{p[len(STAGING_TABLE):]}" for p in partitions),
+        *(f"ALTER INDEX {i} RENAME TO inventory_sales{i[len(STAGING_TABLE):]}"
+          for i in indexes if i.startswith(STAGING_TABLE)),
+    ]
+
+
+def _swap_statements(sequence: str, renames: list[str]) -> list[str]:
+    """Replace inventory_sales and its rollups with the staging tables and rebuild sku_catalog."""
+    return [
+        "LOCK TABLE inventory_sales IN ACCESS EXCLUSIVE MODE",
+        # The id sequence is owned by the old table; move it before the drop
+        f"ALTER SEQUENCE {sequence} OWNED BY {STAGING_TABLE}.id",
+        "DROP TABLE inventory_sales",
+        f"ALTER TABLE {STAGING_TABLE} RENAME TO inventory_sales",
+        *renames,
+        f"ALTER TABLE inventory_sales RENAME CONSTRAINT {STAGING_TABLE}_pkey TO inventory_sales_pkey",
+        f"ALTER INDEX ix_{STAGING_TABLE}_sku_date_id RENAME TO ix_inventory_sales_sku_date_id",
+        f"SELECT setval('{sequence}', GREATEST((SELECT MAX(id) FROM inventory_sales), 1))",
+        *_rollup_swap_statements(),
+        "TRUNCATE sku_catalog",
+        REBUILD_SKU_CATALOG,
+    ]
+
+
+def _check_columns(columns: list[str]) -> None:
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    unknown = [c for c in columns if c not in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    if missing or unknown:
+        raise ValueError(f"Bad input columns (missing {missing}, unexpected {unknown})")
+
+
+def read_csv_chunks(path: str, chunk_rows: int):
+    """
+    Yield (columns, rows, csv_text) blocks from a ledger CSV.
+
+    Lines are passed to COPY as they are, with the row ID prepended, so the
+    file is never parsed in Python. Expects one record per line, as written
+    by generate_data.py.
+    """
+    with open(path, newline="") as f:
+        columns = f.readline().strip().split(",")
+        _check_columns(columns)
+        next_id = 1
+        while True:
+            lines = [line for _, line in zip(range(chunk_rows), f) if line.strip()]
+            if not lines:
+                break
+            if not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            block = "".join(f"{i},{line}" for i, line in enumerate(lines, next_id))
+            yield columns, len(lines), block
+            next_id += len(lines)
+
+
+def read_parquet_chunks(path: str, chunk_rows: int):
+    """Yield (columns, rows, csv_text) blocks from a Parquet file (pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Loading Parquet needs pyarrow (pip install pyarrow)") from e
+
+    parquet = pq.ParquetFile(path)
+    columns = parquet.schema_arrow.names
+    _check_columns(columns)
+    next_id = 1
+    for batch in parquet.iter_batches(batch_size=chunk_rows):
+        ids = pa.array(range(next_id, next_id + batch.num_rows), type=pa.int64())
+        table = pa.Table.from_batches([batch]).add_column(0, "id", ids)
+        buf = io.BytesIO()
+        pa_csv.write_csv(table, buf, pa_csv.WriteOptions(include_header=False))
+        yield columns, batch.num_rows, buf.getvalue().decode()
+        next_id += batch.num_rows
+
+
+def _copy_chunk(engine, columns: list[str], block: str) -> None:
+    """COPY one block into the staging table on its own connection."""
+    sql = f"COPY {STAGING_TABLE} (id, {', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(sql, io.StringIO(block))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bulk_load(engine, path: str = DATA_PATH, workers: int = 4, chunk_rows: int = 200_000) -> dict:
+    """
+    Replace the inventory_sales ledger with the contents of a CSV or Parquet file.
+
+    Args:
+        engine: SQLAlchemy engine (psycopg2 driver) with migrations applied
+        path: Input file; .parquet/.pq are read with pyarrow, anything else as CSV
+        workers: Chunks copied concurrently, each on its own connection
+        chunk_rows: Rows per COPY
+
+    Returns:
+        Row count, per-phase timings and rows/second
+    """
+    if workers < 1 or chunk_rows < 1:
+        raise ValueError("workers and chunk_rows must be >= 1")
+    reader = read_parquet_chunks if path.endswith((".parquet", ".pq")) else read_csv_chunks
+    timings = {}
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('inventory_sales', 'id')")).scalar()
+        for statement in _drop_staging_statements():
+            conn.execute(text(statement))
+        for statement in partitioned_table_statements(STAGING_TABLE, like="inventory_sales", default=True):
+            conn.execute(text(statement))
+        months = [p["lower"] for p in list_partitions(conn) if p["lower"] is not None]
+        first_month = min(months, default=date.today())
+        last_month = add_months(date.today(), PARTITION_AHEAD_MONTHS)
+        ensure_partitions(conn, first_month, last_month, parent=STAGING_TABLE)
+        for table in ROLLUP_TABLES.values():
+            conn.execute(text(f"CREATE TABLE {table}{STAGING_SUFFIX} (LIKE {table} INCLUDING ALL)"))
+
+    # ── COPY chunks, a few in flight at a time ───────────────────
+    rows = 0
+    phase = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for columns, n, block in reader(path, chunk_rows):
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(pool.submit(_copy_chunk, engine, columns, block))
+                rows += n
+            for future in wait(pending).done:
+                future.result()
+        timings["copy_seconds"] = time.perf_counter() - phase
+
+        # ── Partitions for months the live ledger did not have ──
+        # Extending the range both ways keeps the partitions contiguous
+        phase = time.perf_counter()
+        with engine.begin() as conn:
+            first, last = conn.execute(
+                text(f"SELECT MIN(sale_date), MAX(sale_date) FROM {STAGING_TABLE}_default")
+            ).one()
+            if first is not None:
+                ensure_partitions(conn, min(first, first_month), max(last, last_month), parent=STAGING_TABLE)
+            conn.execute(text(f"DROP TABLE {STAGING_TABLE}_default"))
+        timings["partition_seconds"] = time.perf_counter() - phase
+
+        # ── Indexes and constraints, once ───────────────────────
+        phase = time.perf_counter()
+        with engine.begin() as conn:
+            for statement in STAGING_DDL:
+                conn.execute(text(statement))
+        timings["index_seconds"] = time.perf_counter() - phase
+
+        # ── Rollups, from the staging ledger ────────────────────
+        phase = time.perf_counter()
+        with engine.begin() as conn:
+            for statement in build_rollup_statements(STAGING_TABLE, suffix=STAGING_SUFFIX):
+                conn.execute(text(statement))
+        timings["rollup_seconds"] = time.perf_counter() - phase
+    except BaseException:
+        with engine.begin() as conn:
+            for statement in _drop_staging_statements():
+                conn.execute(text(statement))
+        raise
+
+    # ── Swap in the new ledger and rebuild the catalog ──────────
+    phase = time.perf_counter()
+    with engine.begin() as conn:
+        for statement in _swap_statements(sequence, _partition_renames(conn)):
+            conn.execute(text(statement))
+    timings["swap_seconds"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    with engine.begin() as conn:
+        for table in ["inventory_sales", "sku_catalog", *ROLLUP_TABLES.values()]:
+            conn.execute(text(f"ANALYZE {table}"))
+    timings["analyze_seconds"] = time.perf_counter() - phase
+
+    total = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "workers": workers,
+        "chunk_rows": chunk_rows,
+        **{k: round(v, 3) for k, v in timings.items()},
+        "total_seconds": round(total, 3),
+        "copy_rows_per_second": round(rows / timings["copy_seconds"]) if timings["copy_seconds"] else None,
+        "rows_per_second": round(rows / total) if total else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replace inventory_sales from a CSV or Parquet file via COPY.")
+    parser.add_argument("path", nargs="?", default=DATA_PATH)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent COPY connections")
+    parser.add_argument("--chunk-rows", type=int, default=200_000, help="Rows per COPY")
+    args = parser.parse_args()
+
+    load_dotenv()
+    DB_URL = os.getenv("DB_URL")
+    if not DB_URL:
+        raise ValueError("DB_URL not found in environment variables")
+    engine = create_engine(DB_URL, pool_size=args.workers + 1)
+
+    for m in apply_migrations(engine):
+        print(f"Applied migration {m['version']}: {m['name']}")
+
+    report = bulk_load(engine, args.path, workers=args.workers, chunk_rows=args.chunk_rows)
+    print(f"Loaded {report['rows']} rows in {report['total_seconds']:.2f}s "
+          f"({report['rows_per_second']} rows/s overall, {report['copy_rows_per_second']} rows/s COPY; "
+          f"copy {report['copy_seconds']:.2f}s, partitions {report['partition_seconds']:.2f}s, "
+          f"index {report['index_seconds']:.2f}s, "
+          f"rollups {report['rollup_seconds']:.2f}s, swap {report['swap_seconds']:.2f}s)")
@@ -0,0 +1,205 @@
+"""
+Compare per-SKU forests with the global multi-SKU model.
+
+    python compare_models.py                        # ledger CSV, 56-day holdout
+    python compare_models.py --source db --holdout-days 28 --horizon 30
+
+The last --holdout-days of every SKU are held out. Both modes are trained on
+the rest with the same code train.py uses (into a temporary directory), and
+the report covers:
+
+  - training wall time and artifact size on disk
+  - time to load every SKU's model(s) into a ModelStore
+  - latency to score one SKU, and the whole catalog, --horizon days ahead
+  - holdout accuracy (MAE, RMSE, WAPE), overall and for the SKUs with the
+    least history
+
+Results are printed and written to model_comparison.json.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from train import DATA_PATH, train, train_global
+from training_data import read_csv_histories, stream_sku_histories
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend_api"))
+from features import build_features, future_features  # noqa: E402
+from model_store import ModelStore, read_manifest  # noqa: E402
+
+REPORT_PATH = "model_comparison.json"
+
+
+def split_holdout(histories, holdout_days: int) -> tuple:
+    """Split each SKU's history at (last date - holdout_days).
+
+    Returns:
+        (train_histories, holdout) where holdout maps sku_id to (dates, y)
+    """
+    train_histories, holdout = [], {}
+    for sku_id, dates, y, _ in histories:
+        cutoff = dates.max() - np.timedelta64(holdout_days, "D")
+        fit = dates <= cutoff
+        if fit.sum() < 2 or fit.all():
+            continue
+        fit_dates, fit_y = dates[fit], y[fit]
+        watermark = {"rows": int(fit.sum()), "last_sale_date": str(fit_dates.max())}
+        train_histories.append((sku_id, fit_dates, fit_y, watermark))
+        holdout[sku_id] = (dates[~fit], y[~fit])
+    return train_histories, holdout
+
+
+def accuracy(store: ModelStore, holdout: dict, sku_ids: list[str]) -> dict:
+    """MAE, RMSE and WAPE of clipped predictions over the holdout rows."""
+    errors, actuals = [], []
+    for sku_id in sku_ids:
+        dates, y = holdout[sku_id]
+        pred = np.maximum(store[sku_id].predict(build_features(dates)), 0.0)
+        errors.append(pred - y)
+        actuals.append(y)
+    errors = np.concatenate(errors)
+    actuals = np.concatenate(actuals)
+    return {
+        "skus": len(sku_ids),
+        "rows": int(len(errors)),
+        "mae": round(float(np.abs(errors).mean()), 4),
+        "rmse": round(float(np.sqrt((errors ** 2).mean())), 4),
+        "wape": round(float(np.abs(errors).sum() / max(actuals.sum(), 1)), 4),
+    }
+
+
+def serving(model_dir: str, horizon: int, repeats: int) -> tuple:
+    """Load time and predict latency for a freshly opened ModelStore.
+
+    Returns:
+        (measurements, store)
+    """
+    # Room for every SKU, so the timings exclude LRU evictions
+    store = ModelStore(model_dir, max_models=max(len(read_manifest(model_dir)["models"]), 1))
+    sku_ids = sorted(store)
+    X = future_features(date.today(), horizon)
+
+    started = time.perf_counter()
+    for sku_id in sku_ids:
+        store.get(sku_id)
+    load_seconds = time.perf_counter() - started
+
+    single = []
+    for i in range(repeats):
+        sku_id = sku_ids[i % len(sku_ids)]
+        started = time.perf_counter()
+        store[sku_id].predict(X)
+        single.append(time.perf_counter() - started)
+
+    batch = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        store.predict_many(sku_ids, X)
+        batch.append(time.perf_counter() - started)
+
+    stats = store.stats()
+    return {
+        "artifact_bytes": stats["catalog_artifact_bytes"],
+        "load_all_seconds": round(load_seconds, 4),
+        "rss_after_load_bytes": stats["process_rss_bytes"],
+        "predict_one_p50_ms": round(1000 * float(np.median(single)), 3),
+        "predict_catalog_p50_ms": round(1000 * float(np.median(batch)), 3),
+    }, store
+
+
+def compare(histories, holdout_days: int = 56, horizon: int = 14, jobs: int = None,
+            repeats: int = 20, sparse_fraction: float = 0.1) -> dict:
+    """Train both modes on the same split and measure them side by side."""
+    train_histories, holdout = split_holdout(histories, holdout_days)
+    if not train_histories:
+        raise ValueError("No SKU has enough history for the holdout split")
+
+    # SKUs with the shortest training history, where pooling should help most
+    by_rows = sorted(train_histories, key=lambda h: len(h[2]))
+    sparse = [h[0] for h in by_rows[: max(1, int(len(by_rows) * sparse_fraction))]]
+    all_skus = sorted(holdout)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = {
+            "per_sku": lambda d: train(iter(train_histories), model_dir=d, jobs=jobs, forecast_days=0),
+            "global": lambda d: train_global(iter(train_histories), model_dir=d, forecast_days=0),
+        }
+        for mode, run in runs.items():
+            model_dir = os.path.join(tmp, mode)
+            summary = run(model_dir)
+            serve, store = serving(model_dir, horizon, repeats)
+            results[mode] = {
+                "train_wall_seconds": summary["wall_seconds"],
+                **serve,
+                "accuracy": accuracy(store, holdout, all_skus),
+                "accuracy_sparse_skus": accuracy(store, holdout, sparse),
+            }
+
+    return {
+        "skus": len(all_skus),
+        "train_rows": int(sum(len(h[2]) for h in train_histories)),
+        "holdout_days": holdout_days,
+        "horizon": horizon,
+        "sparse_skus": len(sparse),
+        **results,
+    }
+
+
+def print_report(report: dict) -> None:
+    rows = [
+        ("train wall (s)", "train_wall_seconds"),
+        ("artifacts (MB)", "artifact_bytes"),
+        ("load all (s)", "load_all_seconds"),
+        ("predict 1 SKU p50 (ms)", "predict_one_p50_ms"),
+        ("predict catalog p50 (ms)", "predict_catalog_p50_ms"),
+    ]
+    print(f"\n{report['skus']} SKUs, {report['train_rows']} training rows, "
+          f"{report['holdout_days']}-day holdout, {report['horizon']}-day horizon\n")
+    print(f"{'':28}{'per-SKU':>14}{'global':>14}")
+    for label, key in rows:
+        a, b = report["per_sku"][key], report["global"][key]
+        if key == "artifact_bytes":
+            a, b = a / 1e6, b / 1e6
+        print(f"{label:28}{a:>14.3f}{b:>14.3f}")
+    for scope in ("accuracy", "accuracy_sparse_skus"):
+        for metric in ("mae", "rmse", "wape"):
+            label = f"{metric.upper()} ({'all' if scope == 'accuracy' else 'sparse'} SKUs)"
+            print(f"{label:28}{report['per_sku'][scope][metric]:>14.4f}{report['global'][scope][metric]:>14.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-SKU and global demand models.")
+    parser.add_argument("--source", choices=["csv", "db"], default="csv")
+    parser.add_argument("--data", default=DATA_PATH, help="Ledger CSV for --source csv")
+    parser.add_argument("--holdout-days", type=int, default=56)
+    parser.add_argument("--horizon", type=int, default=14)
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for per-SKU training")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed predict calls per measurement")
+    parser.add_argument("--output", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    if args.source == "db":
+        load_dotenv()
+        DB_URL = os.getenv("DB_URL")
+        if not DB_URL:
+            raise ValueError("DB_URL not found in environment variables")
+        histories = list(stream_sku_histories(create_engine(DB_URL)))
+    else:
+        histories = list(read_csv_histories(args.data))
+
+    report = compare(histories, holdout_days=args.holdout_days, horizon=args.horizon,
+                     jobs=args.jobs, repeats=args.repeats)
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
@@ -1,8 +1,24 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+"""
+Synthetic inventory ledger generator.
+
+    python generate_data.py                               # the 5 demo SKUs, 730 days
+    python generate_data.py --skus 10000 --days 1095      # random profiles
+    python generate_data.py --skus 10000 --output ../data/big.parquet
 
-np.random.seed(42)
+Demand for every SKU and day is computed in one NumPy pass (base level,
+weekend effect, monthly seasonality, trend, noise). The stock/replenishment
+recurrence then steps through the days once, updating every SKU in a block
+at the same time. Blocks of --chunk-skus SKUs are written out as they are
+finished (CSV, or Parquet when the output ends in .parquet), so memory is
+bounded by the block rather than the whole dataset.
+"""
+
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
 
 # Define SKUs with distinct demand profiles
 SKUS = {
@@ -18,51 +34,188 @@ MONTH_SEASONALITY = {
     7: 1.00, 8: 0.95, 9: 1.00, 10: 1.05, 11: 1.20, 12: 1.30,
 }
 
-start_date = datetime(2023, 1, 1)
-num_days = 730  # ~2 years
-
-rows = []
-
-for sku_id, cfg in SKUS.items():
-    stock = 500
-    for i in range(num_days):
-        d = start_date + timedelta(days=i)
-        dow = d.weekday()       # 0=Mon … 6=Sun
-        month = d.month
-
-        demand = cfg["base"]
-
-        # Weekend effect
-        if dow >= 5:
-            demand *= cfg["weekend_factor"]
-
-        # Monthly seasonality
-        demand *= MONTH_SEASONALITY[month]
-
-        # Long-term trend (per-month growth/decline)
-        demand *= 1 + cfg["trend"] * (i / 30)
-
-        # Gaussian noise (σ = 15 % of demand)
-        demand = max(1, int(round(demand + np.random.normal(0, demand * 0.15))))
-
-        # Replenishment logic
-        purchase_qty = 0
-        if stock < 200:
-            purchase_qty = int(np.random.randint(300, 600))
-
-        stock = max(0, stock - demand + purchase_qty)
-
-        rows.append({
-            "sku_id": sku_id,
-            "sku_name": cfg["name"],
-            "sale_date": d.strftime("%Y-%m-%d"),
-            "sales_qty": demand,
-            "purchase_qty": purchase_qty,
-            "stock_level": stock,
+START_DATE = date(2023, 1, 1)
+NUM_DAYS = 730  # ~2 years
+OUTPUT_PATH = "../data/inventory_sales.csv"
+
+# Noise σ as a fraction of expected demand
+NOISE = 0.15
+
+
+def builtin_profiles() -> dict:
+    """The five demo SKUs, with the original replenishment rule
+    (order 300–599 units whenever stock drops below 200, starting at 500)."""
+    n = len(SKUS)
+    return {
+        "sku_id": np.array(list(SKUS)),
+        "name": np.array([cfg["name"] for cfg in SKUS.values()]),
+        "base": np.array([cfg["base"] for cfg in SKUS.values()], dtype=float),
+        "weekend_factor": np.array([cfg["weekend_factor"] for cfg in SKUS.values()]),
+        "trend": np.array([cfg["trend"] for cfg in SKUS.values()]),
+        "season_strength": np.ones(n),
+        "initial_stock": np.full(n, 500),
+        "reorder_point": np.full(n, 200),
+        "order_min": np.full(n, 300),
+        "order_max": np.full(n, 600),
+    }
+
+
+def random_profiles(n: int, rng: np.random.Generator) -> dict:
+    """
+    Draw `n` random demand profiles.
+
+    Base demand is log-normal (median ~25/day, long tail), so a large catalog
+    has a few fast movers and many slow ones. Replenishment is scaled to
+    each SKU's base: reorder below ~7 days of demand, order 10–20 days' worth.
+    """
+    base = np.clip(rng.lognormal(mean=np.log(25), sigma=0.9, size=n), 1, 2000)
+    width = len(str(n))
+    return {
+        "sku_id": np.array([f"SKU-{i:0{max(width, 3)}d}" for i in range(1, n + 1)]),
+        "name": np.array([f"Product {i:0{width}d}" for i in range(1, n + 1)]),
+        "base": base,
+        "weekend_factor": rng.uniform(0.5, 1.4, size=n),
+        "trend": rng.uniform(-0.003, 0.01, size=n),
+        "season_strength": rng.uniform(0.0, 1.5, size=n),
+        "initial_stock": np.rint(base * rng.uniform(10, 20, size=n)).astype(np.int64),
+        "reorder_point": np.rint(base * 7).astype(np.int64),
+        "order_min": np.rint(base * 10).astype(np.int64),
+        "order_max": np.rint(base * 20).astype(np.int64) + 1,
+    }
+
+
+def simulate(profiles: dict, start: date, days: int, rng: np.random.Generator) -> tuple:
+    """
+    Simulate sales, purchases and stock for every SKU in `profiles`.
+
+    Returns:
+        (sales, purchases, stock), each int32 of shape (days, n_skus)
+    """
+    dates = np.datetime64(start, "D") + np.arange(days)
+    weekend = ((dates.astype(np.int64) + 3) % 7) >= 5
+    month = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    season = np.array([MONTH_SEASONALITY[m] for m in range(1, 13)])[month - 1]
+    step = np.arange(days) / 30
+
+    demand = (
+        profiles["base"][None, :]
+        * np.where(weekend[:, None], profiles["weekend_factor"][None, :], 1.0)
+        * (1 + profiles["season_strength"][None, :] * (season[:, None] - 1))
+        * (1 + profiles["trend"][None, :] * step[:, None])
+    )
+    demand = demand + rng.standard_normal(demand.shape) * demand * NOISE
+    sales = np.maximum(1, np.rint(demand)).astype(np.int32)
+
+    # Stock depends on yesterday's stock, so step through the days, all SKUs at once
+    n = sales.shape[1]
+    purchases = np.zeros((days, n), dtype=np.int32)
+    levels = np.empty((days, n), dtype=np.int32)
+    stock = profiles["initial_stock"].astype(np.int64)
+    for t in range(days):
+        reorder = stock < profiles["reorder_point"]
+        if reorder.any():
+            qty = rng.integers(profiles["order_min"], profiles["order_max"])
+            purchases[t] = np.where(reorder, qty, 0)
+        stock = np.maximum(0, stock - sales[t] + purchases[t])
+        levels[t] = stock
+    return sales, purchases, levels
+
+
+def generate(profiles: dict, start: date, days: int, rng: np.random.Generator, chunk_skus: int = 1000):
+    """Yield the ledger as DataFrames of up to `chunk_skus` SKUs, SKU by SKU then by date."""
+    dates = (np.datetime64(start, "D") + np.arange(days)).astype("datetime64[s]")
+    n = len(profiles["sku_id"])
+    for lo in range(0, n, chunk_skus):
+        block = {k: v[lo: lo + chunk_skus] for k, v in profiles.items()}
+        sales, purchases, levels = simulate(block, start, days, rng)
+        codes = np.repeat(np.arange(len(block["sku_id"])), days)
+        yield pd.DataFrame({
+            "sku_id": pd.Categorical.from_codes(codes, categories=block["sku_id"]),
+            "sku_name": pd.Categorical.from_codes(codes, categories=block["name"]),
+            "sale_date": np.tile(dates, len(block["sku_id"])),
+            "sales_qty": sales.T.ravel(),
+            "purchase_qty": purchases.T.ravel(),
+            "stock_level": levels.T.ravel(),
         })
 
-df = pd.DataFrame(rows)
-df.to_csv("../data/inventory_sales.csv", index=False)
 
-print(f"Generated {len(df)} rows for {len(SKUS)} SKUs over {num_days} days")
-print(df.groupby("sku_id")["sales_qty"].describe().round(1))
+def _arrow_table(df: pd.DataFrame):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.set_column(2, "sale_date", table["sale_date"].cast(pa.date32()))
+
+
+def write(frames, path: str) -> int:
+    """
+    Stream frames to CSV or Parquet (by extension). Returns the row count.
+
+    Parquet needs pyarrow; CSV uses pyarrow's writer when it is installed
+    (several times faster) and pandas otherwise.
+    """
+    try:
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa_csv = pq = None
+
+    rows = 0
+    if path.endswith((".parquet", ".pq")):
+        if pq is None:
+            raise RuntimeError("Writing Parquet needs pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for df in frames:
+                table = _arrow_table(df)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    with open(path, "wb") as f:
+        writer = None
+        for df in frames:
+            if pa_csv is None:
+                df.to_csv(f, index=False, header=(rows == 0), date_format="%Y-%m-%d")
+            else:
+                table = _arrow_table(df)
+                if writer is None:
+                    # Plain header and unquoted values, same as pandas writes
+                    f.write((",".join(table.column_names) + "\n").encode())
+                    options = pa_csv.WriteOptions(include_header=False, quoting_style="none")
+                    writer = pa_csv.CSVWriter(f, table.schema, write_options=options)
+                writer.write_table(table)
+            rows += len(df)
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic inventory ledger.")
+    parser.add_argument("--skus", type=int, default=None,
+                        help="Number of SKUs with random profiles (default: the 5 demo SKUs)")
+    parser.add_argument("--days", type=int, default=NUM_DAYS)
+    parser.add_argument("--start", type=date.fromisoformat, default=START_DATE, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-skus", type=int, default=1000, help="SKUs simulated and written per block")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="CSV path, or .parquet (needs pyarrow)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    profiles = builtin_profiles() if args.skus is None else random_profiles(args.skus, rng)
+    n_skus = len(profiles["sku_id"])
+
+    started = time.perf_counter()
+    rows = write(generate(profiles, args.start, args.days, rng, args.chunk_skus), args.output)
+    elapsed = time.perf_counter() - started
+
+    print(f"Generated {rows} rows for {n_skus} SKUs over {args.days} days "
+          f"in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) → {args.output}")
+    if n_skus <= 20 and not args.output.endswith((".parquet", ".pq")):
+        df = pd.read_csv(args.output)
+        print(df.groupby("sku_id")["sales_qty"].describe().round(1))
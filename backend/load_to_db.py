@@ -1,44 +1,33 @@
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
+import sys
+from sqlalchemy import create_engine
 from dotenv import load_dotenv
 
+from bulk_load import bulk_load
+
+# Schema lives in the API's migration runner
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend_api"))
+from migrations import apply_migrations  # noqa: E402
+
 load_dotenv()
 
 DB_URL = os.getenv("DB_URL")
 if not DB_URL:
     raise ValueError("DB_URL not found in environment variables")
 
-engine = create_engine(DB_URL)
+WORKERS = int(os.getenv("LOAD_WORKERS", "4"))
 
+engine = create_engine(DB_URL, pool_size=WORKERS + 1)
 
-CREATE_TABLE = """
-CREATE TABLE IF NOT EXISTS inventory_sales (
-    id          SERIAL PRIMARY KEY,
-    sku_id      VARCHAR(20)  NOT NULL,
-    sku_name    VARCHAR(100) NOT NULL,
-    sale_date   DATE         NOT NULL,
-    sales_qty   INTEGER      NOT NULL,
-    purchase_qty INTEGER     NOT NULL DEFAULT 0,
-    stock_level INTEGER      NOT NULL DEFAULT 0
-);
-"""
 
-with engine.begin() as conn:
-    conn.execute(text(CREATE_TABLE))
-    # Clear old rows so re-runs don't duplicate
-    conn.execute(text("DELETE FROM inventory_sales"))
-
-print("Table created / cleared.")
+for m in apply_migrations(engine):
+    print(f"Applied migration {m['version']}: {m['name']}")
 
 #  Load CSV into DB 
-df = pd.read_csv("../data/inventory_sales.csv")
-
-df.to_sql(
-    "inventory_sales",
-    engine,
-    if_exists="append",
-    index=False,
-)
+# Streams the file through COPY into a staging table, builds its indexes,
+# then swaps it in for inventory_sales and rebuilds sku_catalog.
+report = bulk_load(engine, "../data/inventory_sales.csv", workers=WORKERS)
 
-print(f"Inserted {len(df)} rows into inventory_sales table.")
+print(f"Inserted {report['rows']} rows into inventory_sales table "
+      f"({report['rows_per_second']} rows/s, {report['total_seconds']:.2f}s).")
+print("Rebuilt sku_catalog from inventory_sales.")
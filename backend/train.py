@@ -1,39 +1,399 @@
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+"""
+Train demand models and publish them as a new model version.
+
+    python train.py                     # retrain every SKU on all cores
+    python train.py --jobs 4            # limit the process pool
+    python train.py --incremental       # only SKUs with new ledger rows
+    python train.py --source db         # stream the ledger from Postgres
+    python train.py --source rollup     # stream daily totals from Postgres
+    python train.py --forecast-days 0   # skip precomputing forecasts
+    python train.py --mode global       # one shared model for all SKUs
+
+By default each SKU gets its own RandomForest. SKUs are fitted in parallel
+across a process pool; each worker writes its own artifact. Training data
+arrives one SKU at a time (see training_data.py) and only a few SKUs per
+worker are in flight, so memory is bounded by the largest SKU rather than
+the whole ledger. In incremental mode a SKU whose watermark (row count and
+last sale date) matches the active manifest is carried over untouched;
+with --source db or rollup the watermark is the one in sku_catalog, and
+unchanged SKUs are not even read.
+
+Per-SKU timing and scores go to training_report.json in the version
+directory.
+
+Because every feature is derived from the date, each SKU's predictions for
+the next --forecast-days days are fully determined once it is trained.
+They are precomputed into forecasts.npy alongside the models so the API can
+answer forecasts by slicing instead of running the forest.
+
+--mode global instead fits one gradient-boosted model on every SKU's rows,
+with the SKU features from features.sku_stats. Its size and fit time grow
+with the number of rows rather than the number of SKUs, and sparse SKUs
+borrow strength from the rest. compare_models.py measures the two modes
+against each other.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+from typing import Iterable
+
 import joblib
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sqlalchemy import create_engine
 
-# ── Load data ────────────────────────────────────────────────
-df = pd.read_csv("../data/inventory_sales.csv")
-df["sale_date"] = pd.to_datetime(df["sale_date"])
-
-# ── Feature engineering ──────────────────────────────────────
-df["day_of_week"]  = df["sale_date"].dt.dayofweek
-df["month"]        = df["sale_date"].dt.month
-df["day_of_month"] = df["sale_date"].dt.day
-df["day_of_year"]  = df["sale_date"].dt.dayofyear
-df["is_weekend"]   = (df["day_of_week"] >= 5).astype(int)
-df["week_of_year"] = df["sale_date"].dt.isocalendar().week.astype(int)
-
-FEATURES = ["day_of_week", "month", "day_of_month",
-            "day_of_year", "is_weekend", "week_of_year"]
-
-# ── Train one RandomForest model per SKU ─────────────────────
-models = {}
-for sku_id in sorted(df["sku_id"].unique()):
-    sku_df = df[df["sku_id"] == sku_id]
-    X = sku_df[FEATURES]
-    y = sku_df["sales_qty"]
-
-    model = RandomForestRegressor(
+from training_data import catalog_watermarks, read_csv_histories, stream_sku_histories
+
+# Feature code is shared with the API so train and serve stay identical
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend_api"))
+from features import (  # noqa: E402
+    FEATURES,
+    SKU_FEATURES,
+    build_features,
+    build_global_features,
+    future_features,
+    sku_stats,
+)
+from model_store import (  # noqa: E402
+    GLOBAL,
+    MANIFEST_NAME,
+    PER_SKU,
+    ModelSetWriter,
+    predict_shared,
+    prune_versions,
+    read_manifest,
+)
+
+MODEL_DIR = "models"
+DATA_PATH = "../data/inventory_sales.csv"
+REPORT_NAME = "training_report.json"
+FORECAST_DAYS = 400
+
+
+def make_model() -> RandomForestRegressor:
+    # One core per forest; parallelism comes from fitting SKUs side by side
+    return RandomForestRegressor(
         n_estimators=150,
         max_depth=12,
         random_state=42,
+        n_jobs=1,
     )
+
+
+def make_global_model() -> HistGradientBoostingRegressor:
+    # Histogram boosting bins the inputs, so it stays fast and small on
+    # millions of rows where a deep forest would not
+    return HistGradientBoostingRegressor(
+        max_iter=300,
+        learning_rate=0.1,
+        max_leaf_nodes=63,
+        min_samples_leaf=20,
+        random_state=42,
+    )
+
+
+def forecast_ahead(model, X_forecast) -> np.ndarray:
+    """Clipped predictions over a precomputed feature matrix, or None if there is none."""
+    if X_forecast is None or not len(X_forecast):
+        return None
+    return np.maximum(model.predict(X_forecast), 0.0).astype(np.float32)
+
+
+def fit_sku(sku_id: str, dates, y, path: str, X_forecast=None) -> dict:
+    """Fit and save one SKU's model and forecast it ahead (runs in a worker process)."""
+    started = time.perf_counter()
+    X = build_features(dates)
+    model = make_model()
+    model.fit(X, y)
+    r2 = model.score(X, y)
+    # Uncompressed, so the API can memory-map it
+    joblib.dump(model, path)
+    return {
+        "sku_id": sku_id,
+        "n_train": len(y),
+        "r2": round(r2, 4),
+        "seconds": round(time.perf_counter() - started, 3),
+        "forecast": forecast_ahead(model, X_forecast),
+    }
+
+
+def forecast_sku(sku_id: str, path: str, X_forecast) -> tuple:
+    """Forecast a carried-over SKU from its saved artifact (runs in a worker process)."""
+    return sku_id, forecast_ahead(joblib.load(path), X_forecast)
+
+
+def train(
+    histories: Iterable[tuple],
+    model_dir: str = MODEL_DIR,
+    jobs: int = None,
+    incremental: bool = False,
+    carry_over: Iterable[str] = (),
+    forecast_days: int = FORECAST_DAYS,
+) -> dict:
+    """
+    Train (or carry over) every SKU in `histories` and publish a new version.
+
+    Args:
+        histories: (sku_id, dates, sales_qty, watermark) tuples, one per SKU
+        model_dir: Root of the versioned model directory
+        jobs: Worker processes (default: all cores)
+        incremental: Reuse SKUs whose watermark matches the active manifest
+        carry_over: SKUs to reuse from the active manifest without data
+            (already known to be unchanged)
+        forecast_days: Days after today to precompute per SKU (0 to skip)
+
+    Returns:
+        The training report
+    """
+    started = time.perf_counter()
+    os.makedirs(model_dir, exist_ok=True)
+
+    previous = None
+    if incremental and os.path.exists(os.path.join(model_dir, MANIFEST_NAME)):
+        previous = read_manifest(model_dir)
+        if previous.get("kind", PER_SKU) != PER_SKU:
+            previous = None
+
+    writer = ModelSetWriter(model_dir, kind=PER_SKU, features=FEATURES)
+    report = []
+    watermarks = {}
+    forecasts = {}
+    reused = []
+    jobs = jobs or os.cpu_count() or 1
+
+    # Forecast days start tomorrow, matching future_features(today, ...) in the API
+    forecast_start = date.today() + timedelta(days=1)
+    X_forecast = future_features(date.today(), forecast_days) if forecast_days > 0 else None
+
+    def reuse(sku_id):
+        prev = previous["models"][sku_id]
+        writer.reuse(sku_id, previous)
+        reused.append(sku_id)
+        report.append({"sku_id": sku_id, "status": "reused", "n_train": prev.get("n_train"),
+                       "r2": prev.get("r2"), "seconds": 0.0})
+
+    def record(result):
+        sku_id = result["sku_id"]
+        forecasts[sku_id] = result.pop("forecast")
+        writer.register(sku_id, n_train=result["n_train"], r2=result["r2"], watermark=watermarks.pop(sku_id))
+        report.append({**result, "status": "trained"})
+        print(f"  {sku_id}  R² = {result['r2']:.4f}  (n={result['n_train']}, {result['seconds']:.2f}s)")
+
+    # ── Carry over SKUs known to be unchanged ───────────────────
+    if previous:
+        for sku_id in carry_over:
+            if sku_id in previous["models"]:
+                reuse(sku_id)
+
+    # ── Fit the rest as they stream in ──────────────────────────
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    pending = set()
+    try:
+        for sku_id, dates, y, watermark in histories:
+            prev = previous["models"].get(sku_id) if previous else None
+            if prev is not None and prev.get("watermark") == watermark:
+                reuse(sku_id)
+                continue
+
+            watermarks[sku_id] = watermark
+            if pool is None:
+                record(fit_sku(sku_id, dates, y, writer.path_for(sku_id), X_forecast))
+                continue
+
+            # Back-pressure: keep at most two SKUs per worker in flight so
+            # the loader cannot run ahead and buffer the whole ledger
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future.result())
+            pending.add(pool.submit(fit_sku, sku_id, dates, y, writer.path_for(sku_id), X_forecast))
+
+        for future in wait(pending).done:
+            record(future.result())
+
+        # ── Forecast carried-over SKUs from their artifacts ─────────
+        if X_forecast is not None and reused:
+            if pool is None:
+                results = (forecast_sku(s, writer.path_for(s), X_forecast) for s in reused)
+            else:
+                futures = [pool.submit(forecast_sku, s, writer.path_for(s), X_forecast) for s in reused]
+                results = (f.result() for f in futures)
+            forecasts.update(results)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # ── Publish ─────────────────────────────────────────────────
+    if X_forecast is not None:
+        writer.add_forecasts(forecast_start, forecasts)
+    manifest = writer.commit()
+    elapsed = time.perf_counter() - started
+    summary = {
+        "version": manifest["version"],
+        "previous_version": previous["version"] if previous else None,
+        "incremental": incremental,
+        "jobs": jobs,
+        "trained": sum(1 for r in report if r["status"] == "trained"),
+        "reused": sum(1 for r in report if r["status"] == "reused"),
+        "wall_seconds": round(elapsed, 3),
+        "fit_seconds": round(sum(r["seconds"] for r in report), 3),
+        "forecast_start": str(forecast_start) if X_forecast is not None else None,
+        "forecast_days": forecast_days if X_forecast is not None else 0,
+        "skus": sorted(report, key=lambda r: r["sku_id"]),
+    }
+    with open(os.path.join(writer.directory, REPORT_NAME), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    prune_versions(model_dir, keep=3)
+    return summary
+
+
+def global_training_set(histories: Iterable[tuple]) -> tuple:
+    """
+    Stack every SKU's rows into one float32 matrix for the global model.
+
+    Returns:
+        (X, y, skus) where skus maps sku_id to its manifest entry
+        (code, SKU features, n_train, watermark)
+    """
+    blocks, targets, skus = [], [], {}
+    for code, (sku_id, dates, y, watermark) in enumerate(histories):
+        # Rounded here so training sees exactly what the manifest stores
+        stats = np.round(sku_stats(dates, y), 4)
+        n = len(y)
+        blocks.append(build_global_features(build_features(dates), np.full(n, code), np.tile(stats, (n, 1))))
+        targets.append(np.asarray(y, dtype=np.float32))
+        skus[sku_id] = {"code": code, "stats": stats.tolist(), "n_train": n, "watermark": watermark}
+    if not skus:
+        raise ValueError("No training data")
+    return np.vstack(blocks), np.concatenate(targets), skus
+
+
+def train_global(histories: Iterable[tuple], model_dir: str = MODEL_DIR, forecast_days: int = FORECAST_DAYS) -> dict:
+    """
+    Fit one model across all SKUs in `histories` and publish it as a new version.
+
+    Args:
+        histories: (sku_id, dates, sales_qty, watermark) tuples, one per SKU
+        model_dir: Root of the versioned model directory
+        forecast_days: Days after today to precompute per SKU (0 to skip)
+
+    Returns:
+        The training report
+    """
+    started = time.perf_counter()
+    os.makedirs(model_dir, exist_ok=True)
+
+    X, y, skus = global_training_set(histories)
+    fit_started = time.perf_counter()
+    model = make_global_model()
     model.fit(X, y)
-    models[sku_id] = model
+    r2 = model.score(X, y)
+    fit_seconds = time.perf_counter() - fit_started
+    del X, y
+
+    writer = ModelSetWriter(model_dir, kind=GLOBAL, features=FEATURES + SKU_FEATURES)
+    writer.add_shared(model)
+    for sku_id, entry in skus.items():
+        writer.describe(sku_id, **entry)
+
+    # One batched predict covers the whole catalog's forecast horizon
+    forecast_start = date.today() + timedelta(days=1)
+    if forecast_days > 0:
+        sku_ids = list(skus)
+        demand = predict_shared(
+            model,
+            future_features(date.today(), forecast_days),
+            [skus[s]["code"] for s in sku_ids],
+            [skus[s]["stats"] for s in sku_ids],
+        )
+        writer.add_forecasts(forecast_start, dict(zip(sku_ids, np.maximum(demand, 0.0))))
+
+    manifest = writer.commit()
+    summary = {
+        "version": manifest["version"],
+        "mode": GLOBAL,
+        "trained": len(skus),
+        "reused": 0,
+        "n_train": sum(e["n_train"] for e in skus.values()),
+        "r2": round(r2, 4),
+        "artifact_bytes": writer.shared["bytes"],
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "fit_seconds": round(fit_seconds, 3),
+        "forecast_start": str(forecast_start) if forecast_days > 0 else None,
+        "forecast_days": max(forecast_days, 0),
+    }
+    with open(os.path.join(writer.directory, REPORT_NAME), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    prune_versions(model_dir, keep=3)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train demand models.")
+    parser.add_argument("--mode", choices=["per-sku", "global"], default="per-sku",
+                        help="One forest per SKU, or one shared model for all SKUs")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only retrain SKUs with new rows since the active version")
+    parser.add_argument("--source", choices=["csv", "db", "rollup"], default="csv",
+                        help="Read the ledger CSV, or stream inventory_sales (db) or its daily "
+                             "rollup (rollup) from Postgres (DB_URL)")
+    parser.add_argument("--data", default=DATA_PATH, help="Ledger CSV for --source csv")
+    parser.add_argument("--chunk-rows", type=int, default=100_000,
+                        help="Rows per server-side cursor fetch for --source db/rollup")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--forecast-days", type=int, default=FORECAST_DAYS,
+                        help="Days of forecasts to precompute per SKU (0 to skip)")
+    args = parser.parse_args()
+    if args.mode == "global" and args.incremental:
+        parser.error("--incremental only applies to --mode per-sku")
+
+    # ── Load data ────────────────────────────────────────────────
+    carry_over = []
+    if args.source in ("db", "rollup"):
+        load_dotenv()
+        DB_URL = os.getenv("DB_URL")
+        if not DB_URL:
+            raise ValueError("DB_URL not found in environment variables")
+        engine = create_engine(DB_URL)
 
-    print(f"  {sku_id}  R² = {model.score(X, y):.4f}  (n={len(sku_df)})")
+        # The catalog keeps row counts and last sale dates up to date, so
+        # unchanged SKUs can be skipped before reading any ledger rows. Its
+        # watermarks are also the ones recorded in the manifest: they still
+        # count rows that retention has archived out of the ledger.
+        sku_ids = None
+        current = catalog_watermarks(engine)
+        manifest_path = os.path.join(args.model_dir, MANIFEST_NAME)
+        if args.incremental and os.path.exists(manifest_path):
+            manifest = read_manifest(args.model_dir)
+            active = manifest["models"] if manifest.get("kind", PER_SKU) == PER_SKU else {}
+            carry_over = [s for s, w in current.items() if s in active and active[s].get("watermark") == w]
+            unchanged = set(carry_over)
+            sku_ids = [s for s in current if s not in unchanged]
+        histories = stream_sku_histories(engine, sku_ids=sku_ids, chunk_rows=args.chunk_rows,
+                                         daily=args.source == "rollup", watermarks=current)
+    else:
+        histories = read_csv_histories(args.data)
 
-# ── Save ─────────────────────────────────────────────────────
-joblib.dump(models, "models.pkl")
-print(f"\nSaved {len(models)} per-SKU models → models.pkl")
+    # ── Train ────────────────────────────────────────────────────
+    if args.mode == "global":
+        summary = train_global(histories, model_dir=args.model_dir, forecast_days=args.forecast_days)
+        print(f"\nSaved global model for {summary['trained']} SKUs → "
+              f"{args.model_dir}/{summary['version']}/ "
+              f"(R² = {summary['r2']:.4f}, n={summary['n_train']}, {summary['wall_seconds']:.1f}s wall)")
+    else:
+        summary = train(histories, model_dir=args.model_dir, jobs=args.jobs,
+                        incremental=args.incremental, carry_over=carry_over,
+                        forecast_days=args.forecast_days)
+        print(f"\nSaved {summary['trained'] + summary['reused']} per-SKU models → "
+              f"{args.model_dir}/{summary['version']}/ "
+              f"({summary['trained']} trained, {summary['reused']} reused, "
+              f"{summary['wall_seconds']:.1f}s wall on {summary['jobs']} jobs)")
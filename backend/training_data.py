@@ -0,0 +1,129 @@
+"""
+Training data loaders.
+
+Both loaders yield one SKU at a time as
+    (sku_id, dates: datetime64[D] array, sales_qty: int32 array, watermark)
+so the trainer never holds more than the SKUs it is currently fitting.
+
+The Postgres loader reads inventory_sales through a server-side cursor in
+fixed-size chunks ordered by (sku_id, sale_date, id) — the ledger index
+from migration 3 — and cuts the stream at SKU boundaries. Dates come back
+as int32 day numbers, SKU IDs as a per-chunk categorical. With
+daily=True it reads the inventory_sales_daily rollup instead: one row per
+SKU and day with that day's total sales, in primary-key order.
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _history(sku_id: str, days: np.ndarray, sales_qty: np.ndarray, rows: int = None) -> tuple:
+    dates = EPOCH + days.astype("timedelta64[D]")
+    watermark = {"rows": int(len(days) if rows is None else rows), "last_sale_date": str(dates.max())}
+    return sku_id, dates, sales_qty, watermark
+
+
+def stream_sku_histories(engine, sku_ids: list[str] | None = None, chunk_rows: int = 100_000,
+                         daily: bool = False, watermarks: dict[str, dict] | None = None) -> Iterator[tuple]:
+    """
+    Stream the ledger from Postgres one SKU at a time.
+
+    Args:
+        engine: SQLAlchemy engine for the inventory database
+        sku_ids: Only these SKUs (all SKUs if None)
+        chunk_rows: Rows fetched per round trip from the server-side cursor
+        daily: Read daily totals from the inventory_sales_daily rollup
+            (fewer rows when SKUs have several transactions a day)
+        watermarks: Per-SKU watermarks from catalog_watermarks, yielded in
+            place of the counted ones. Pass them for incremental training:
+            retention archives ledger rows but not their catalog (or
+            rollup) counts, so only the catalog's watermark compares the
+            same way on every source.
+
+    Yields:
+        (sku_id, dates, sales_qty, watermark) in sku_id order
+    """
+    if daily:
+        query = text("""
+            SELECT sku_id,
+                   (bucket - DATE '1970-01-01') AS day,
+                   sales_qty,
+                   records
+            FROM inventory_sales_daily
+            WHERE (:all_skus OR sku_id = ANY(:sku_ids))
+            ORDER BY sku_id, bucket
+        """)
+    else:
+        query = text("""
+            SELECT sku_id,
+                   (sale_date - DATE '1970-01-01') AS day,
+                   sales_qty,
+                   1 AS records
+            FROM inventory_sales
+            WHERE (:all_skus OR sku_id = ANY(:sku_ids))
+            ORDER BY sku_id, sale_date, id
+        """)
+    params = {"all_skus": sku_ids is None, "sku_ids": list(sku_ids or [])}
+
+    watermarks = watermarks or {}
+
+    def history(sku_id, days_parts, qty_parts, records):
+        sku_id, dates, sales_qty, watermark = _history(
+            sku_id, np.concatenate(days_parts), np.concatenate(qty_parts), records)
+        return sku_id, dates, sales_qty, watermarks.get(sku_id, watermark)
+
+    current, days_parts, qty_parts, records = None, [], [], 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(query, params)
+        for rows in result.partitions(chunk_rows):
+            chunk = pd.DataFrame(rows, columns=["sku_id", "day", "sales_qty", "records"])
+            chunk = chunk.astype({"sku_id": "category", "day": "int32", "sales_qty": "int32", "records": "int32"})
+
+            # Rows arrive sorted by SKU, so each group is a contiguous run
+            for sku_id, piece in chunk.groupby("sku_id", sort=False, observed=True):
+                if sku_id != current:
+                    if current is not None:
+                        yield history(current, days_parts, qty_parts, records)
+                    current, days_parts, qty_parts, records = sku_id, [], [], 0
+                days_parts.append(piece["day"].to_numpy())
+                qty_parts.append(piece["sales_qty"].to_numpy())
+                records += int(piece["records"].sum())
+
+    if current is not None:
+        yield history(current, days_parts, qty_parts, records)
+
+
+def catalog_watermarks(engine) -> dict[str, dict]:
+    """Per-SKU watermarks from sku_catalog, without touching the ledger."""
+    query = text("SELECT sku_id, total_records, last_sale_date FROM sku_catalog")
+    with engine.connect() as conn:
+        rows = conn.execute(query).fetchall()
+    return {
+        r[0]: {"rows": int(r[1]), "last_sale_date": str(r[2])}
+        for r in rows
+        if r[2] is not None
+    }
+
+
+def read_csv_histories(path: str) -> Iterator[tuple]:
+    """Read a ledger CSV with compact dtypes and yield it one SKU at a time."""
+    df = pd.read_csv(
+        path,
+        usecols=["sku_id", "sale_date", "sales_qty"],
+        dtype={"sku_id": "category", "sales_qty": "int32"},
+    )
+    days = pd.to_datetime(df["sale_date"]).to_numpy().astype("datetime64[D]").astype(np.int32)
+    qty = df["sales_qty"].to_numpy()
+
+    # Stable sort keeps each SKU's rows in file (date) order
+    codes = df["sku_id"].cat.codes.to_numpy()
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    for idx in np.split(order, bounds):
+        if len(idx):
+            yield _history(df["sku_id"].cat.categories[codes[idx[0]]], days[idx], qty[idx])
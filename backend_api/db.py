@@ -1,11 +1,20 @@
 """
 Database helper – all PostgreSQL queries live here.
+
+Each query carries a `query_name` execution option, which the API's
+metrics use to time statements by name (see metrics.instrument_engine).
 """
 
 import os
+from contextlib import contextmanager
+from datetime import date
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
 
+from partitions import list_partitions
+from rollups import ROLLUP_TABLES, rollup_upsert
+
 load_dotenv()
 
 DB_URL = os.getenv("DB_URL")
@@ -14,49 +23,101 @@ if not DB_URL:
 
 engine = create_engine(DB_URL, pool_pre_ping=True)
 
+# CTEs folding the rows of an `ins` CTE into every rollup table
+_ROLLUP_CTES = ",\n".join(f"roll_{g} AS ({rollup_upsert(g, 'ins')})" for g in ROLLUP_TABLES)
+
+
+def _no_partition(sale_date: date) -> str:
+    return (f"No inventory_sales partition for {sale_date:%Y-%m}: "
+            f"the month has been archived or is too far ahead")
+
+
+@contextmanager
+def _connection(conn=None, begin: bool = False):
+    """Use the caller's connection if given, otherwise check one out of the pool.
+
+    Every query function takes an optional `conn`, which lets db_async run
+    the same SQL on an async connection via AsyncConnection.run_sync.
+    """
+    if conn is not None:
+        yield conn
+    else:
+        with (engine.begin() if begin else engine.connect()) as c:
+            yield c
+
+
+def get_all_skus(conn=None) -> list[dict]:
+    """Return every SKU with its latest stock level and row count.
 
-def get_all_skus() -> list[dict]:
-    """Return distinct SKUs with their latest stock level and row count."""
+    Reads the per-SKU sku_catalog table, so the cost is O(#SKUs) no matter
+    how large the inventory_sales ledger grows.
+    """
     query = text("""
         SELECT
-            d.sku_id,
-            d.sku_name,
-            d.stock_level AS current_stock,
-            cnt.total_records
-        FROM (
-            SELECT DISTINCT ON (sku_id)
-                   sku_id, sku_name, stock_level
-            FROM inventory_sales
-            ORDER BY sku_id, sale_date DESC, id DESC
-        ) d
-        INNER JOIN (
-            SELECT sku_id,
-                   COUNT(*)::int AS total_records
-            FROM inventory_sales
-            GROUP BY sku_id
-        ) cnt ON d.sku_id = cnt.sku_id
-        ORDER BY d.sku_id
-    """)
-    with engine.connect() as conn:
+            sku_id,
+            sku_name,
+            current_stock,
+            total_records
+        FROM sku_catalog
+        ORDER BY sku_id
+    """).execution_options(query_name="get_all_skus")
+    with _connection(conn) as conn:
         rows = conn.execute(query).mappings().all()
     return [dict(r) for r in rows]
 
 
 #  Historical sales 
-def get_history(sku_id: str, days: int) -> list[dict]:
-    """Return the last N days of sales for a given SKU."""
+HISTORY_GRANULARITIES = ("day", "week", "month")
+
+# Keyset start for the first page: after every real (sale_date, id)
+_CURSOR_END = (date.max, 2**31 - 1)
+
+
+def encode_cursor(sale_date: date, row_id: int) -> str:
+    """Opaque-ish page cursor: the (sale_date, id) key the next page must stay below."""
+    return f"{sale_date.isoformat()}:{row_id}"
+
+
+def decode_cursor(cursor: str | None) -> tuple[date, int]:
+    """Parse a cursor from encode_cursor (None or empty means the newest page).
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return _CURSOR_END
+    try:
+        day, row_id = cursor.split(":")
+        return date.fromisoformat(day), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from None
+
+
+def _history_rows(sku_id: str, limit: int, before: tuple, conn) -> tuple[list[dict], str | None]:
+    """Newest `limit` ledger rows below the `before` key, returned oldest-first."""
+    # The plain sale_date bound is redundant with the row comparison but is
+    # what lets the planner skip newer partitions; the newest-first Append
+    # then stops in the first partition(s) that fill the page.
     query = text("""
-        SELECT sale_date, sales_qty, purchase_qty, stock_level
+        SELECT id, sale_date, sales_qty, purchase_qty, stock_level
         FROM inventory_sales
         WHERE sku_id = :sku_id
+          AND sale_date <= :before_date
+          AND (sale_date, id) < (:before_date, :before_id)
         ORDER BY sale_date DESC, id DESC
-        LIMIT :days
-    """)
-    with engine.connect() as conn:
-        rows = conn.execute(query, {"sku_id": sku_id, "days": days}).mappings().all()
+        LIMIT :limit
+    """).execution_options(query_name="get_history")
+    params = {"sku_id": sku_id, "before_date": before[0], "before_id": before[1], "limit": limit + 1}
+    rows = conn.execute(query, params).mappings().all()
+
+    # One extra row tells us whether there is an older page
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["sale_date"], rows[-1]["id"])
 
     # Reverse so oldest-first
-    return [
+    history = [
         {
             "date": str(r["sale_date"]),
             "sales_qty": int(r["sales_qty"]),
@@ -65,25 +126,184 @@ def get_history(sku_id: str, days: int) -> list[dict]:
         }
         for r in reversed(rows)
     ]
+    return history, next_cursor
+
+
+def _history_buckets(sku_id: str, limit: int, granularity: str, before: tuple, conn) -> tuple[list[dict], str | None]:
+    """Newest `limit` calendar weeks/months below the `before` key, aggregated in SQL.
+
+    Only rows inside those buckets are read (an index range scan), so the
+    cost follows the buckets shown rather than the history stored.
+    """
+    # granularity is one of HISTORY_GRANULARITIES, never user text
+    query = text(f"""
+        WITH window_start AS (
+            SELECT CAST(
+                date_trunc('{granularity}', CAST(MAX(sale_date) AS timestamp))
+                - (:limit - 1) * INTERVAL '1 {granularity}'
+            AS date) AS lower
+            FROM inventory_sales
+            WHERE sku_id = :sku_id
+              AND sale_date <= :before_date
+              AND (sale_date, id) < (:before_date, :before_id)
+        ),
+        bounds AS (
+            SELECT lower, EXISTS (
+                SELECT 1 FROM inventory_sales o
+                WHERE o.sku_id = :sku_id AND o.sale_date < lower
+            ) AS has_more
+            FROM window_start
+        )
+        SELECT
+            CAST(date_trunc('{granularity}', CAST(s.sale_date AS timestamp)) AS date) AS bucket,
+            SUM(s.sales_qty)    AS sales_qty,
+            SUM(s.purchase_qty) AS purchase_qty,
+            (array_agg(s.stock_level ORDER BY s.sale_date DESC, s.id DESC))[1] AS stock_level,
+            COUNT(*)            AS records,
+            b.has_more
+        FROM inventory_sales s
+        JOIN bounds b ON s.sale_date >= b.lower
+        WHERE s.sku_id = :sku_id
+          AND s.sale_date <= :before_date
+          AND (s.sale_date, s.id) < (:before_date, :before_id)
+        GROUP BY 1, b.has_more
+        ORDER BY 1
+    """).execution_options(query_name=f"get_history.{granularity}")
+    params = {"sku_id": sku_id, "before_date": before[0], "before_id": before[1], "limit": limit}
+    rows = conn.execute(query, params).mappings().all()
+
+    next_cursor = encode_cursor(rows[0]["bucket"], 0) if rows and rows[0]["has_more"] else None
+    history = [
+        {
+            "date": str(r["bucket"]),
+            "sales_qty": int(r["sales_qty"]),
+            "purchase_qty": int(r["purchase_qty"]),
+            "stock_level": int(r["stock_level"]),
+            "records": int(r["records"]),
+        }
+        for r in rows
+    ]
+    return history, next_cursor
+
+
+def _bucket_aligned(before: tuple, granularity: str) -> bool:
+    """True when the page starts on a bucket boundary, so whole rollup rows apply."""
+    if before == _CURSOR_END:
+        return True
+    day, row_id = before
+    return row_id == 0 and (day.weekday() == 0 if granularity == "week" else day.day == 1)
+
+
+def _history_rollup(sku_id: str, limit: int, granularity: str, before: tuple, conn) -> tuple[list[dict], str | None]:
+    """_history_buckets answered from the weekly/monthly rollup table: one row per bucket."""
+    table = ROLLUP_TABLES[granularity]
+    query = text(f"""
+        WITH window_start AS (
+            SELECT CAST(MAX(bucket) - (:limit - 1) * INTERVAL '1 {granularity}' AS date) AS lower
+            FROM {table}
+            WHERE sku_id = :sku_id AND bucket < :before_date
+        ),
+        bounds AS (
+            SELECT lower, EXISTS (
+                SELECT 1 FROM {table} o
+                WHERE o.sku_id = :sku_id AND o.bucket < lower
+            ) AS has_more
+            FROM window_start
+        )
+        SELECT r.bucket, r.sales_qty, r.purchase_qty, r.closing_stock AS stock_level, r.records, b.has_more
+        FROM {table} r
+        JOIN bounds b ON r.bucket >= b.lower
+        WHERE r.sku_id = :sku_id AND r.bucket < :before_date
+        ORDER BY r.bucket
+    """).execution_options(query_name=f"get_history.{granularity}_rollup")
+    rows = conn.execute(query, {"sku_id": sku_id, "before_date": before[0], "limit": limit}).mappings().all()
+
+    next_cursor = encode_cursor(rows[0]["bucket"], 0) if rows and rows[0]["has_more"] else None
+    history = [
+        {
+            "date": str(r["bucket"]),
+            "sales_qty": int(r["sales_qty"]),
+            "purchase_qty": int(r["purchase_qty"]),
+            "stock_level": int(r["stock_level"]),
+            "records": int(r["records"]),
+        }
+        for r in rows
+    ]
+    return history, next_cursor
+
+
+def get_history_page(sku_id: str, limit: int, granularity: str = "day", cursor: str | None = None,
+                     conn=None) -> dict:
+    """Return one page of a SKU's history, newest page first, entries oldest-first.
+
+    Pages are keyed on (sale_date, id): `next_cursor` is the key of the
+    oldest entry returned and the next page continues below it, so paging
+    stays cheap however deep it goes and is not disturbed by new rows.
+
+    Args:
+        sku_id: The SKU identifier
+        limit: Ledger rows (day) or calendar buckets (week/month) per page
+        granularity: "day" for raw rows, or "week"/"month" to sum sales and
+            purchases per bucket and report the bucket's closing stock (read
+            from the rollup tables, one row per bucket)
+        cursor: next_cursor from the previous page, or None for the newest
+
+    Returns:
+        {"history": [...], "next_cursor": str or None when this is the oldest page}
+
+    Raises:
+        ValueError: If the granularity, limit or cursor is invalid
+    """
+    if granularity not in HISTORY_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(HISTORY_GRANULARITIES)}")
+    if limit < 1:
+        raise ValueError("limit must be >= 1")
+    before = decode_cursor(cursor)
+    with _connection(conn) as conn:
+        if granularity == "day":
+            history, next_cursor = _history_rows(sku_id, limit, before, conn)
+        elif _bucket_aligned(before, granularity):
+            history, next_cursor = _history_rollup(sku_id, limit, granularity, before, conn)
+        else:
+            # A cursor from a day page can fall mid-bucket; aggregate the ledger
+            history, next_cursor = _history_buckets(sku_id, limit, granularity, before, conn)
+    return {"history": history, "next_cursor": next_cursor}
+
+
+def get_history(sku_id: str, days: int, conn=None) -> list[dict]:
+    """Return the last N days of sales for a given SKU."""
+    return get_history_page(sku_id, days, conn=conn)["history"]
 
 
 #  Current stock for a single SKU 
-def get_current_stock(sku_id: str) -> int:
+def get_current_stock(sku_id: str, conn=None) -> int:
     """Return the most recent stock_level for the SKU."""
     query = text("""
-        SELECT stock_level
-        FROM inventory_sales
+        SELECT current_stock
+        FROM sku_catalog
         WHERE sku_id = :sku_id
-        ORDER BY sale_date DESC, id DESC
-        LIMIT 1
-    """)
-    with engine.connect() as conn:
+    """).execution_options(query_name="get_current_stock")
+    with _connection(conn) as conn:
         row = conn.execute(query, {"sku_id": sku_id}).fetchone()
     return int(row[0]) if row else 0
 
 
+#  Current stock for many SKUs in one query 
+def get_current_stocks(sku_ids: list[str] | None = None, conn=None) -> dict[str, int]:
+    """Return {sku_id: latest stock_level} for the given SKUs (all SKUs if None)."""
+    query = text("""
+        SELECT sku_id, current_stock
+        FROM sku_catalog
+        WHERE (:all_skus OR sku_id = ANY(:sku_ids))
+    """).execution_options(query_name="get_current_stocks")
+    params = {"all_skus": sku_ids is None, "sku_ids": list(sku_ids or [])}
+    with _connection(conn) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return {r[0]: int(r[1]) for r in rows}
+
+
 #  Record a transaction (sale/purchase) 
-def record_transaction(sku_id: str, sales_qty: int, purchase_qty: int, transaction_date: str) -> dict:
+def record_transaction(sku_id: str, sales_qty: int, purchase_qty: int, transaction_date: str, conn=None) -> dict:
     """Record a sales/purchase transaction and update stock level.
     
     Args:
@@ -96,53 +316,80 @@ def record_transaction(sku_id: str, sales_qty: int, purchase_qty: int, transacti
         Dictionary with transaction details and updated stock level
     
     Raises:
-        ValueError: If SKU not found or invalid data
+        ValueError: If SKU not found, invalid data, or no partition holds the date
     """
-    # Get current stock and SKU info
-    get_sku_query = text("""
-        SELECT sku_id, sku_name, stock_level
-        FROM inventory_sales
-        WHERE sku_id = :sku_id
-        ORDER BY sale_date DESC, id DESC
-        LIMIT 1
-    """)
+    # One statement, one round trip: lock the SKU's catalog row (writers to
+    # other SKUs are not blocked), check the new stock is non-negative,
+    # append the ledger row, fold it into the rollups and move the catalog
+    # forward. Concurrent writers
+    # to the same SKU queue on the row lock and re-read the committed stock.
+    # The catalog follows the ledger's "latest row" rule: a back-dated
+    # transaction is counted but does not replace the current stock.
+    record_query = text(f"""
+        WITH cur AS (
+            SELECT sku_id, sku_name, current_stock
+            FROM sku_catalog
+            WHERE sku_id = :sku_id
+            FOR UPDATE
+        ),
+        ins AS (
+            INSERT INTO inventory_sales (sku_id, sku_name, sale_date, sales_qty, purchase_qty, stock_level)
+            SELECT sku_id, sku_name, CAST(:sale_date AS DATE), :sales_qty, :purchase_qty,
+                   current_stock + :purchase_qty - :sales_qty
+            FROM cur
+            WHERE current_stock + :purchase_qty - :sales_qty >= 0
+            RETURNING id, sku_id, sale_date, sales_qty, purchase_qty, stock_level, 1 AS records
+        ),
+        {_ROLLUP_CTES},
+        upd AS (
+            UPDATE sku_catalog c
+            SET total_records  = c.total_records + 1,
+                current_stock  = CASE WHEN c.last_sale_date IS NULL OR ins.sale_date >= c.last_sale_date
+                                      THEN ins.stock_level ELSE c.current_stock END,
+                last_sale_date = GREATEST(c.last_sale_date, ins.sale_date),
+                updated_at     = NOW()
+            FROM ins
+            WHERE c.sku_id = :sku_id
+        )
+        SELECT cur.sku_name, cur.current_stock, ins.id, ins.stock_level
+        FROM cur
+        LEFT JOIN ins ON TRUE
+    """).execution_options(query_name="record_transaction")
     
-    with engine.connect() as conn:
-        sku_row = conn.execute(get_sku_query, {"sku_id": sku_id}).fetchone()
+    try:
+        sale_date = date.fromisoformat(transaction_date)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid transaction_date '{transaction_date}', expected YYYY-MM-DD")
     
-    if not sku_row:
-        raise ValueError(f"SKU '{sku_id}' not found in database")
+    try:
+        with _connection(conn, begin=True) as conn:
+            row = conn.execute(
+                record_query,
+                {
+                    "sku_id": sku_id,
+                    "sale_date": sale_date,
+                    "sales_qty": sales_qty,
+                    "purchase_qty": purchase_qty,
+                }
+            ).fetchone()
+    except IntegrityError as e:
+        # Postgres finds no monthly partition for the row (see partitions.py)
+        if "no partition" in str(e.orig):
+            raise ValueError(_no_partition(sale_date)) from None
+        raise
     
-    current_stock = int(sku_row[2])
-    sku_name = sku_row[1]
+    if not row:
+        raise ValueError(f"SKU '{sku_id}' not found in database")
     
-    # Calculate new stock level: current + purchases - sales
-    new_stock_level = current_stock + purchase_qty - sales_qty
+    sku_name = row[0]
+    current_stock = int(row[1])
     
-    # Ensure stock doesn't go negative
-    if new_stock_level < 0:
+    # No ledger row means the stock check in the statement failed
+    if row[2] is None:
         raise ValueError(f"Insufficient stock. Current: {current_stock}, Cannot sell: {sales_qty}")
     
-    # Insert transaction record
-    insert_query = text("""
-        INSERT INTO inventory_sales (sku_id, sku_name, sale_date, sales_qty, purchase_qty, stock_level)
-        VALUES (:sku_id, :sku_name, :sale_date, :sales_qty, :purchase_qty, :stock_level)
-        RETURNING id
-    """)
-    
-    with engine.begin() as conn:
-        result = conn.execute(
-            insert_query,
-            {
-                "sku_id": sku_id,
-                "sku_name": sku_name,
-                "sale_date": transaction_date,
-                "sales_qty": sales_qty,
-                "purchase_qty": purchase_qty,
-                "stock_level": new_stock_level,
-            }
-        )
-        transaction_id = result.scalar()
+    transaction_id = row[2]
+    new_stock_level = int(row[3])
     
     return {
         "id": transaction_id,
@@ -158,6 +405,160 @@ def record_transaction(sku_id: str, sales_qty: int, purchase_qty: int, transacti
 
 
 
+#  Record many transactions in one database transaction 
+def record_transactions_bulk(transactions: list[dict], conn=None) -> list[dict]:
+    """Record a batch of sales/purchase transactions across many SKUs.
+    
+    Lines are applied in the order given, exactly as if record_transaction
+    were called for each one: stock runs forward per SKU from the catalog
+    value, and a line that would take stock negative is rejected without
+    affecting the others. All accepted lines are written with a single
+    multi-row INSERT (which also folds them into the rollups) and one
+    catalog UPDATE, inside one transaction that
+    holds row locks on the affected SKUs.
+    
+    Args:
+        transactions: Dicts with sku_id, sales_qty, purchase_qty and
+                      transaction_date (YYYY-MM-DD)
+    
+    Returns:
+        One result dict per input line, in input order, with status
+        "recorded" or "rejected"
+    """
+    sku_ids = sorted({t["sku_id"] for t in transactions})
+    
+    # Lock in a fixed order so concurrent batches cannot deadlock
+    lock_query = text("""
+        SELECT sku_id, sku_name, current_stock, last_sale_date
+        FROM sku_catalog
+        WHERE sku_id = ANY(:sku_ids)
+        ORDER BY sku_id
+        FOR UPDATE
+    """).execution_options(query_name="record_transactions_bulk.lock")
+    
+    next_ids_query = text("""
+        SELECT nextval(pg_get_serial_sequence('inventory_sales', 'id'))
+        FROM generate_series(1, :n)
+    """).execution_options(query_name="record_transactions_bulk.next_ids")
+    
+    insert_query = text(f"""
+        WITH ins AS (
+            INSERT INTO inventory_sales (id, sku_id, sku_name, sale_date, sales_qty, purchase_qty, stock_level)
+            SELECT * FROM unnest(
+                CAST(:ids AS integer[]),
+                CAST(:sku_ids AS varchar[]),
+                CAST(:sku_names AS varchar[]),
+                CAST(:sale_dates AS date[]),
+                CAST(:sales_qtys AS integer[]),
+                CAST(:purchase_qtys AS integer[]),
+                CAST(:stock_levels AS integer[])
+            )
+            RETURNING id, sku_id, sale_date, sales_qty, purchase_qty, stock_level, 1 AS records
+        ),
+        {_ROLLUP_CTES}
+        SELECT COUNT(*) FROM ins
+    """).execution_options(query_name="record_transactions_bulk.insert")
+    
+    update_catalog_query = text("""
+        UPDATE sku_catalog c
+        SET total_records  = c.total_records + u.added,
+            current_stock  = u.current_stock,
+            last_sale_date = u.last_sale_date,
+            updated_at     = NOW()
+        FROM unnest(
+            CAST(:sku_ids AS varchar[]),
+            CAST(:added AS integer[]),
+            CAST(:current_stocks AS integer[]),
+            CAST(:last_sale_dates AS date[])
+        ) AS u(sku_id, added, current_stock, last_sale_date)
+        WHERE c.sku_id = u.sku_id
+    """).execution_options(query_name="record_transactions_bulk.update_catalog")
+    
+    results = []
+    accepted = []
+    
+    with _connection(conn, begin=True) as conn:
+        catalog = {
+            r["sku_id"]: dict(r, added=0)
+            for r in conn.execute(lock_query, {"sku_ids": sku_ids}).mappings().all()
+        }
+        # Months the ledger can take a row for
+        months = {p["lower"] for p in list_partitions(conn)}
+        
+        for line, t in enumerate(transactions):
+            sku = catalog.get(t["sku_id"])
+            result = {
+                "line": line,
+                "sku_id": t["sku_id"],
+                "sale_date": t["transaction_date"],
+                "sales_qty": t["sales_qty"],
+                "purchase_qty": t["purchase_qty"],
+            }
+            results.append(result)
+            
+            try:
+                sale_date = date.fromisoformat(t["transaction_date"])
+            except (TypeError, ValueError):
+                result.update(status="rejected", error=f"Invalid transaction_date '{t['transaction_date']}'")
+                continue
+            
+            if sale_date.replace(day=1) not in months:
+                result.update(status="rejected", error=_no_partition(sale_date))
+                continue
+            
+            if sku is None:
+                result.update(status="rejected", error=f"SKU '{t['sku_id']}' not found in database")
+                continue
+            
+            current_stock = int(sku["current_stock"])
+            new_stock_level = current_stock + t["purchase_qty"] - t["sales_qty"]
+            if new_stock_level < 0:
+                result.update(
+                    status="rejected",
+                    error=f"Insufficient stock. Current: {current_stock}, Cannot sell: {t['sales_qty']}",
+                )
+                continue
+            
+            # Same "latest row" rule as record_transaction
+            if sku["last_sale_date"] is None or sale_date >= sku["last_sale_date"]:
+                sku["current_stock"] = new_stock_level
+                sku["last_sale_date"] = sale_date
+            sku["added"] += 1
+            
+            result.update(
+                status="recorded",
+                sku_name=sku["sku_name"],
+                previous_stock=current_stock,
+                new_stock_level=new_stock_level,
+            )
+            accepted.append((result, sale_date))
+        
+        if accepted:
+            ids = [r[0] for r in conn.execute(next_ids_query, {"n": len(accepted)}).fetchall()]
+            for (result, _), transaction_id in zip(accepted, ids):
+                result["id"] = int(transaction_id)
+            
+            conn.execute(insert_query, {
+                "ids": ids,
+                "sku_ids": [r["sku_id"] for r, _ in accepted],
+                "sku_names": [r["sku_name"] for r, _ in accepted],
+                "sale_dates": [d for _, d in accepted],
+                "sales_qtys": [r["sales_qty"] for r, _ in accepted],
+                "purchase_qtys": [r["purchase_qty"] for r, _ in accepted],
+                "stock_levels": [r["new_stock_level"] for r, _ in accepted],
+            })
+            
+            touched = [s for s in catalog.values() if s["added"]]
+            conn.execute(update_catalog_query, {
+                "sku_ids": [s["sku_id"] for s in touched],
+                "added": [s["added"] for s in touched],
+                "current_stocks": [int(s["current_stock"]) for s in touched],
+                "last_sale_dates": [s["last_sale_date"] for s in touched],
+            })
+    
+    return results
+
+
 # REPLENISHMENT SETTINGS - New functionality for stock replenishment recommendations
 
 
@@ -171,12 +572,12 @@ DEFAULT_REPLENISHMENT_SETTINGS = {
 }
 
 
-def get_replenishment_settings(sku_id: str) -> dict:
+def get_replenishment_settings(sku_id: str, conn=None) -> dict:
     """
     Get replenishment settings for a SKU.
     
     Returns custom settings if saved, otherwise returns sensible defaults.
-    Ensures defaults are used gracefully without requiring pre-populated database entries.
+    The replenishment_settings table is created by migrations.py.
     
     Args:
         sku_id: The SKU identifier
@@ -197,27 +598,23 @@ def get_replenishment_settings(sku_id: str) -> dict:
         FROM replenishment_settings
         WHERE sku_id = :sku_id
         LIMIT 1
-    """)
+    """).execution_options(query_name="get_replenishment_settings")
     
-    try:
-        with engine.connect() as conn:
-            row = conn.execute(query, {"sku_id": sku_id}).mappings().fetchone()
-        
-        if row:
-            return {
-                "sku_id": row["sku_id"],
-                "lead_time_days": int(row["lead_time_days"]),
-                "min_order_qty": int(row["min_order_qty"]),
-                "reorder_point": int(row["reorder_point"]),
-                "safety_stock": int(row["safety_stock"]),
-                "target_stock_level": int(row["target_stock_level"]),
-                "created_at": str(row["created_at"]),
-                "updated_at": str(row["updated_at"]),
-                "is_custom": True,
-            }
-    except Exception as e:
-        # Table might not exist yet; fall through to defaults
-        pass
+    with _connection(conn) as conn:
+        row = conn.execute(query, {"sku_id": sku_id}).mappings().fetchone()
+    
+    if row:
+        return {
+            "sku_id": row["sku_id"],
+            "lead_time_days": int(row["lead_time_days"]),
+            "min_order_qty": int(row["min_order_qty"]),
+            "reorder_point": int(row["reorder_point"]),
+            "safety_stock": int(row["safety_stock"]),
+            "target_stock_level": int(row["target_stock_level"]),
+            "created_at": str(row["created_at"]),
+            "updated_at": str(row["updated_at"]),
+            "is_custom": True,
+        }
     
     # Return defaults with indication that these are defaults
     return {
@@ -227,7 +624,56 @@ def get_replenishment_settings(sku_id: str) -> dict:
     }
 
 
-def set_replenishment_settings(sku_id: str, settings: dict) -> dict:
+def get_all_replenishment_settings(sku_ids: list[str], conn=None) -> dict[str, dict]:
+    """
+    Get replenishment settings for many SKUs in one query.
+
+    SKUs without saved settings get the defaults, as in get_replenishment_settings.
+
+    Args:
+        sku_ids: The SKU identifiers
+
+    Returns:
+        Dictionary mapping sku_id to its settings dictionary
+    """
+    query = text("""
+        SELECT 
+            sku_id, 
+            lead_time_days, 
+            min_order_qty, 
+            reorder_point, 
+            safety_stock, 
+            target_stock_level
+        FROM replenishment_settings
+        WHERE sku_id = ANY(:sku_ids)
+    """).execution_options(query_name="get_all_replenishment_settings")
+
+    with _connection(conn) as conn:
+        rows = conn.execute(query, {"sku_ids": list(sku_ids)}).mappings().all()
+
+    custom = {}
+    for row in rows:
+        custom[row["sku_id"]] = {
+            "sku_id": row["sku_id"],
+            "lead_time_days": int(row["lead_time_days"]),
+            "min_order_qty": int(row["min_order_qty"]),
+            "reorder_point": int(row["reorder_point"]),
+            "safety_stock": int(row["safety_stock"]),
+            "target_stock_level": int(row["target_stock_level"]),
+            "is_custom": True,
+        }
+
+    return {
+        sku_id: custom.get(sku_id) or {
+            "sku_id": sku_id,
+            **DEFAULT_REPLENISHMENT_SETTINGS,
+            "is_custom": False,
+        }
+        for sku_id in sku_ids
+    }
+
+
+def set_replenishment_settings(sku_id: str, settings: dict, conn=None) -> dict:
     """
     Set or update replenishment settings for a SKU.
     
@@ -243,13 +689,13 @@ def set_replenishment_settings(sku_id: str, settings: dict) -> dict:
     """
     # Validate SKU exists
     check_sku_query = text("""
-        SELECT sku_id FROM inventory_sales 
-        WHERE sku_id = :sku_id 
-        LIMIT 1
-    """)
+        SELECT sku_id FROM sku_catalog 
+        WHERE sku_id = :sku_id
+    """).execution_options(query_name="set_replenishment_settings.check_sku")
     
-    with engine.connect() as conn:
-        sku_row = conn.execute(check_sku_query, {"sku_id": sku_id}).fetchone()
+    # Bound to its own name: `conn` must stay the caller's (or None) for the upsert below
+    with _connection(conn) as check_conn:
+        sku_row = check_conn.execute(check_sku_query, {"sku_id": sku_id}).fetchone()
     
     if not sku_row:
         raise ValueError(f"SKU '{sku_id}' not found in inventory")
@@ -287,10 +733,10 @@ def set_replenishment_settings(sku_id: str, settings: dict) -> dict:
             target_stock_level = EXCLUDED.target_stock_level,
             updated_at = NOW()
         RETURNING *
-    """)
+    """).execution_options(query_name="set_replenishment_settings.upsert")
     
     try:
-        with engine.begin() as conn:
+        with _connection(conn, begin=True) as conn:
             result = conn.execute(
                 upsert_query,
                 {
@@ -319,6 +765,6 @@ def set_replenishment_settings(sku_id: str, settings: dict) -> dict:
         if "replenishment_settings" in str(e).lower() and "does not exist" in str(e).lower():
             raise ValueError(
                 "Replenishment settings table not yet created. "
-                "Please ensure the database has been properly initialized."
+                "Run `python migrations.py` to initialize the database."
             )
         raise ValueError(f"Error saving replenishment settings: {str(e)}")
@@ -0,0 +1,91 @@
+"""
+Async database helper – async versions of the queries in db.py.
+
+The SQL and row handling live in db.py; each function here checks out an
+asyncpg connection and runs the db.py function on it through
+AsyncConnection.run_sync, so the two paths cannot drift apart.
+"""
+
+import os
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import db
+from metrics import DB_POOL_WAIT_SECONDS, REGISTRY, instrument_engine
+
+# Defaults to DB_URL with the driver swapped for asyncpg
+ASYNC_DB_URL = os.getenv("ASYNC_DB_URL") or make_url(db.DB_URL).set(drivername="postgresql+asyncpg")
+
+async_engine = create_async_engine(
+    ASYNC_DB_URL,
+    pool_pre_ping=True,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+)
+instrument_engine(async_engine.sync_engine)
+
+REGISTRY.callback(
+    "db_pool_connections", "Async pool connections by state.",
+    lambda: {
+        ("checked_out",): async_engine.pool.checkedout(),
+        ("idle",): async_engine.pool.checkedin(),
+        ("overflow",): max(async_engine.pool.overflow(), 0),
+    },
+    labels=("state",),
+)
+
+
+async def _run(fn, *args, begin: bool = False, **kwargs):
+    """Run a db.py query function on a pooled async connection."""
+    ctx = async_engine.begin() if begin else async_engine.connect()
+    started = time.perf_counter()
+    async with ctx as conn:
+        DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        return await conn.run_sync(lambda sync_conn: fn(*args, conn=sync_conn, **kwargs))
+
+
+async def get_all_skus() -> list[dict]:
+    """Async db.get_all_skus."""
+    return await _run(db.get_all_skus)
+
+
+async def get_history_page(sku_id: str, limit: int, granularity: str = "day", cursor: str | None = None) -> dict:
+    """Async db.get_history_page."""
+    return await _run(db.get_history_page, sku_id, limit, granularity, cursor)
+
+
+async def get_current_stock(sku_id: str) -> int:
+    """Async db.get_current_stock."""
+    return await _run(db.get_current_stock, sku_id)
+
+
+async def get_current_stocks(sku_ids: list[str] | None = None) -> dict[str, int]:
+    """Async db.get_current_stocks."""
+    return await _run(db.get_current_stocks, sku_ids)
+
+
+async def record_transaction(sku_id: str, sales_qty: int, purchase_qty: int, transaction_date: str) -> dict:
+    """Async db.record_transaction."""
+    return await _run(db.record_transaction, sku_id, sales_qty, purchase_qty, transaction_date, begin=True)
+
+
+async def record_transactions_bulk(transactions: list[dict]) -> list[dict]:
+    """Async db.record_transactions_bulk."""
+    return await _run(db.record_transactions_bulk, transactions, begin=True)
+
+
+async def get_replenishment_settings(sku_id: str) -> dict:
+    """Async db.get_replenishment_settings."""
+    return await _run(db.get_replenishment_settings, sku_id)
+
+
+async def get_all_replenishment_settings(sku_ids: list[str]) -> dict[str, dict]:
+    """Async db.get_all_replenishment_settings."""
+    return await _run(db.get_all_replenishment_settings, sku_ids)
+
+
+async def set_replenishment_settings(sku_id: str, settings: dict) -> dict:
+    """Async db.set_replenishment_settings."""
+    return await _run(db.set_replenishment_settings, sku_id, settings, begin=True)
@@ -0,0 +1,203 @@
+"""
+Streaming Arrow IPC / Parquet exports of the ledger and precomputed forecasts.
+
+    curl -o ledger.arrow "http://127.0.0.1:8000/export/ledger?sku_id=SKU-001&start=2024-01-01"
+    curl -o ledger.parquet "http://127.0.0.1:8000/export/ledger?format=parquet"
+    pyarrow.ipc.open_stream(urlopen(url)).read_pandas()
+
+The ledger is read through a server-side cursor `batch_rows` rows at a
+time, in (sku_id, sale_date, id) order. Each chunk becomes one Arrow
+record batch (one row group in Parquet), is encoded and handed to the
+client, then dropped — memory stays at one batch however large the export.
+Forecasts are sliced out of the memory-mapped forecasts.npy a block of SKUs
+at a time in the same way.
+
+The generators here are synchronous (psycopg2 and NumPy); Starlette runs
+them on its threadpool when they back a StreamingResponse.
+"""
+
+from datetime import date
+from typing import Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+LEDGER_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("sku_id", pa.string()),
+    ("sku_name", pa.string()),
+    ("sale_date", pa.date32()),
+    ("sales_qty", pa.int32()),
+    ("purchase_qty", pa.int32()),
+    ("stock_level", pa.int32()),
+])
+
+FORECAST_SCHEMA = pa.schema([
+    ("sku_id", pa.string()),
+    ("forecast_date", pa.date32()),
+    ("predicted_sales", pa.float32()),
+])
+
+EPOCH = date(1970, 1, 1)
+
+
+def ledger_batches(engine, sku_ids: list[str] | None = None, start: date | None = None,
+                   end: date | None = None, batch_rows: int = 65_536,
+                   table: str = "inventory_sales") -> Iterator[pa.RecordBatch]:
+    """
+    Stream inventory_sales rows as Arrow record batches.
+
+    Args:
+        engine: Synchronous SQLAlchemy engine (psycopg2)
+        sku_ids: Only these SKUs (all SKUs if None)
+        start: First sale_date to include (no lower bound if None)
+        end: Last sale_date to include (no upper bound if None)
+        batch_rows: Rows per cursor fetch and per record batch
+        table: Ledger table to read (a single partition, when archiving)
+
+    Yields:
+        RecordBatches with LEDGER_SCHEMA, in (sku_id, sale_date, id) order
+    """
+    query = text(f"""
+        SELECT id, sku_id, sku_name, sale_date, sales_qty, purchase_qty, stock_level
+        FROM {table}
+        WHERE (:all_skus OR sku_id = ANY(:sku_ids))
+          AND sale_date BETWEEN :start AND :end
+        ORDER BY sku_id, sale_date, id
+    """).execution_options(query_name="export_ledger")
+    params = {
+        "all_skus": sku_ids is None,
+        "sku_ids": list(sku_ids or []),
+        "start": start or date.min,
+        "end": end or date.max,
+    }
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_rows).execute(query, params)
+        for rows in result.partitions(batch_rows):
+            columns = list(zip(*rows))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, LEDGER_SCHEMA)],
+                schema=LEDGER_SCHEMA,
+            )
+
+
+def forecast_batches(store, sku_ids: list[str] | None = None, start: date | None = None,
+                     end: date | None = None, batch_rows: int = 65_536) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a model version's precomputed forecasts as Arrow record batches.
+
+    Args:
+        store: ModelStore of the version to export
+        sku_ids: Only these SKUs (every SKU with forecasts if None)
+        start: First forecast date (the start of the precomputed range if None)
+        end: Last forecast date (its end if None)
+        batch_rows: Approximate rows per record batch (whole SKUs per batch)
+
+    Yields:
+        RecordBatches with FORECAST_SCHEMA, one row per SKU and date, in sku_id order
+    """
+    precomputed = store.precomputed_forecasts()
+    if precomputed is None:
+        return
+    first, matrix, rows = precomputed
+    wanted = sorted(rows if sku_ids is None else set(sku_ids) & set(rows))
+
+    lo = 0 if start is None else max((start - first).days, 0)
+    hi = matrix.shape[1] if end is None else min((end - first).days + 1, matrix.shape[1])
+    days = hi - lo
+    if days <= 0 or not wanted:
+        return
+
+    day_numbers = np.arange((first - EPOCH).days + lo, (first - EPOCH).days + hi, dtype=np.int32)
+    skus_per_batch = max(1, batch_rows // days)
+    for i in range(0, len(wanted), skus_per_batch):
+        block = wanted[i: i + skus_per_batch]
+        values = matrix[[rows[s] for s in block], lo:hi]
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(np.repeat(np.array(block, dtype=object), days), type=pa.string()),
+                pa.array(np.tile(day_numbers, len(block))).cast(pa.date32()),
+                pa.array(np.ascontiguousarray(values, dtype=np.float32).ravel()),
+            ],
+            schema=FORECAST_SCHEMA,
+        )
+
+
+class _Drain:
+    """Write-only file object whose contents are taken out after each batch."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def encode_stream(batches: Iterator[pa.RecordBatch], schema: pa.Schema, fmt: str,
+                  metadata: dict | None = None) -> Iterator[bytes]:
+    """
+    Encode record batches as an Arrow IPC stream or a Parquet file, incrementally.
+
+    The bytes for each batch are yielded as soon as it is written, so only
+    one batch is ever held. Parquet gets one row group per batch; the
+    footer comes last.
+
+    Args:
+        batches: Record batches matching `schema`
+        schema: Schema of the output
+        fmt: "arrow" or "parquet"
+        metadata: Extra key/values stored in the schema metadata
+
+    Yields:
+        Encoded bytes
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if metadata:
+        schema = schema.with_metadata({k: str(v) for k, v in metadata.items()})
+
+    sink = _Drain()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in batches:
+            if fmt == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_batch(batch, row_group_size=batch.num_rows)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.take()
+
@@ -0,0 +1,121 @@
+"""
+Calendar feature builder shared by training and serving.
+
+Every model input is a pure function of the date, so features for any set of
+dates are computed in one vectorized NumPy pass over datetime64[D] values.
+
+The global (multi-SKU) model also sees a few SKU-level inputs computed once
+from each SKU's training history (see sku_stats); they are stored in the
+model manifest and appended to the calendar features at predict time.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+FEATURES = [
+    "day_of_week", "month", "day_of_month",
+    "day_of_year", "is_weekend", "week_of_year",
+]
+
+# Extra inputs for the global model, appended after FEATURES
+SKU_FEATURES = ["sku_code", "sku_mean", "sku_level", "sku_dow_mean"]
+
+# Days of recent history averaged into sku_level
+LEVEL_DAYS = 28
+
+
+def date_range(start: date, days: int) -> np.ndarray:
+    """Return `days` consecutive dates beginning at `start` as datetime64[D]."""
+    first = np.datetime64(start, "D")
+    return first + np.arange(days, dtype="timedelta64[D]")
+
+
+def build_features(dates) -> np.ndarray:
+    """
+    Build the model input matrix for an array of dates.
+
+    Args:
+        dates: Anything convertible to datetime64[D] (dates, ISO strings,
+               a pandas datetime column's values, ...)
+
+    Returns:
+        C-contiguous int32 array of shape (len(dates), len(FEATURES))
+    """
+    d = np.asarray(dates, dtype="datetime64[D]")
+    day_num = d.astype(np.int64)
+
+    # 1970-01-01 was a Thursday; shift so Monday == 0 like date.weekday()
+    day_of_week = (day_num + 3) % 7
+
+    month_start = d.astype("datetime64[M]")
+    year_start = d.astype("datetime64[Y]")
+    month = month_start.astype(np.int64) % 12 + 1
+    day_of_month = (d - month_start).astype(np.int64) + 1
+    day_of_year = (d - year_start).astype(np.int64) + 1
+
+    # ISO week: the week belongs to the year containing its Thursday
+    thursday = d + (3 - day_of_week).astype("timedelta64[D]")
+    iso_year_start = thursday.astype("datetime64[Y]").astype("datetime64[D]")
+    week_of_year = (thursday - iso_year_start).astype(np.int64) // 7 + 1
+
+    X = np.empty((d.shape[0], len(FEATURES)), dtype=np.int32)
+    X[:, 0] = day_of_week
+    X[:, 1] = month
+    X[:, 2] = day_of_month
+    X[:, 3] = day_of_year
+    X[:, 4] = day_of_week >= 5
+    X[:, 5] = week_of_year
+    return X
+
+
+def future_features(today: date, days: int) -> np.ndarray:
+    """Feature matrix for the `days` days following `today`."""
+    return build_features(date_range(today + timedelta(days=1), days))
+
+
+def sku_stats(dates, sales_qty) -> np.ndarray:
+    """
+    Summarise one SKU's history for the global model.
+
+    Args:
+        dates: The SKU's sale dates
+        sales_qty: Units sold on each of those dates
+
+    Returns:
+        float64 array of 9 values: overall mean, mean of the last
+        LEVEL_DAYS days, then the mean for each weekday (Monday first)
+    """
+    d = np.asarray(dates, dtype="datetime64[D]")
+    y = np.asarray(sales_qty, dtype=np.float64)
+    mean = y.mean()
+    level = y[d > d.max() - LEVEL_DAYS].mean()
+
+    day_of_week = (d.astype(np.int64) + 3) % 7
+    sums = np.bincount(day_of_week, weights=y, minlength=7)
+    counts = np.bincount(day_of_week, minlength=7)
+    dow_mean = np.where(counts > 0, sums / np.maximum(counts, 1), mean)
+    return np.concatenate([[mean, level], dow_mean])
+
+
+def build_global_features(X: np.ndarray, codes: np.ndarray, stats: np.ndarray) -> np.ndarray:
+    """
+    Append SKU features to calendar features, row by row.
+
+    Args:
+        X: Calendar features from build_features, shape (n, len(FEATURES))
+        codes: Integer SKU code for each row, shape (n,)
+        stats: sku_stats of each row's SKU, shape (n, 9)
+
+    Returns:
+        float32 array of shape (n, len(FEATURES) + len(SKU_FEATURES))
+    """
+    X = np.asarray(X)
+    stats = np.asarray(stats)
+    out = np.empty((X.shape[0], len(FEATURES) + len(SKU_FEATURES)), dtype=np.float32)
+    out[:, : len(FEATURES)] = X
+    out[:, len(FEATURES)] = codes
+    out[:, len(FEATURES) + 1] = stats[:, 0]
+    out[:, len(FEATURES) + 2] = stats[:, 1]
+    out[:, len(FEATURES) + 3] = stats[np.arange(X.shape[0]), 2 + X[:, 0]]
+    return out
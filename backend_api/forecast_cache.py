@@ -0,0 +1,115 @@
+"""
+In-process cache for per-SKU demand forecasts.
+
+Every model input is derived from the calendar, so the prediction for a given
+(sku_id, day, horizon) is fixed for the whole day. Entries are kept in LRU
+order, bounded in size, dropped at the date rollover and whenever the set of
+loaded models changes.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Hashable, Optional
+
+
+class ForecastCache:
+    """Thread-safe LRU cache of daily demand predictions."""
+
+    def __init__(self, max_entries: int = 4096):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._model_version: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _roll_day(self, today: date) -> None:
+        """Drop everything computed for a previous day (caller holds the lock)."""
+        if self._day != today:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._day = today
+
+    def get(
+        self,
+        sku_id: str,
+        horizon: int,
+        today: Optional[date] = None,
+        model_version: Optional[Hashable] = None,
+    ) -> Optional[tuple]:
+        """Return cached predictions, or None on a miss.
+
+        A caller still holding an older model version always misses.
+        """
+        today = today or date.today()
+        key = (sku_id, today, horizon)
+        with self._lock:
+            self._roll_day(today)
+            stale = model_version is not None and model_version != self._model_version
+            value = None if stale else self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(
+        self,
+        sku_id: str,
+        horizon: int,
+        predictions,
+        today: Optional[date] = None,
+        model_version: Optional[Hashable] = None,
+    ) -> tuple:
+        """Store predictions for (sku_id, today, horizon) and return them as a tuple.
+
+        Predictions made with a model version other than the current one are
+        returned but not stored, so a request that finishes on an old model
+        after a swap cannot repopulate the cache with stale results.
+        """
+        today = today or date.today()
+        value = tuple(float(p) for p in predictions)
+        key = (sku_id, today, horizon)
+        with self._lock:
+            if model_version is not None and model_version != self._model_version:
+                return value
+            self._roll_day(today)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def set_model_version(self, version: Hashable) -> None:
+        """Record the identity of the loaded models, clearing the cache if it changed."""
+        with self._lock:
+            if version != self._model_version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._model_version = version
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "day": str(self._day) if self._day else None,
+                "model_version": self._model_version,
+            }
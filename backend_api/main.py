@@ -1,23 +1,64 @@
-print("THIS FILE IS RUNNING")
-
 from fastapi import FastAPI, Query, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-import joblib
-import pandas as pd
+import asyncio
+import math
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import date, timedelta
+from typing import Literal, Optional, Union
 
-from db import (
+from db_async import (
+    async_engine,
     get_all_skus,
-    get_history as db_get_history,
+    get_history_page,
     get_current_stock,
+    get_current_stocks,
     record_transaction,
+    record_transactions_bulk,
     get_replenishment_settings,
+    get_all_replenishment_settings,
     set_replenishment_settings,
 )
-from replenishment import ReplenishmentRecommendationEngine
+from replenishment import ReplenishmentRecommendationEngine, URGENCY_RANK
+from forecast_cache import ForecastCache
+from features import future_features
+from model_store import ModelRegistry, ModelStore
+from partitions import PartitionMaintainer
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MODEL_PREDICT_BATCH_SKUS,
+    MODEL_PREDICT_SECONDS,
+    REGISTRY as METRICS,
+    MetricsMiddleware,
+    instrument_engine,
+)
+from responses import CompressionMiddleware, FastJSONResponse, ResponseFormat, to_columns
+from export import EXPORT_FORMATS, FORECAST_SCHEMA, LEDGER_SCHEMA, encode_stream, forecast_batches, ledger_batches
+import db
+
+# Model evaluation is CPU-bound, so it runs here instead of on the event loop
+predict_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PREDICT_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="predict",
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    registry.start()
+    partition_maintainer.start()
+    yield
+    partition_maintainer.stop()
+    registry.stop()
+    predict_executor.shutdown(wait=False)
+    await async_engine.dispose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +67,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESS_MIN_BYTES", "1024")))
+# Outermost, so the latency covers CORS, compression and error responses too
+app.add_middleware(MetricsMiddleware)
 
 class TransactionRequest(BaseModel):
     """Request body for recording a sales/purchase transaction."""
@@ -46,6 +90,27 @@ class TransactionRequest(BaseModel):
 
 
 
+class BulkTransactionRequest(BaseModel):
+    """Request body for recording many transactions at once."""
+    transactions: list[TransactionRequest] = Field(..., min_length=1, max_length=50000, description="Transactions, applied in order")
+
+
+class BatchForecastRequest(BaseModel):
+    """Request body for forecasting many SKUs in one call."""
+    sku_ids: Union[Literal["all"], list[str]] = Field(default="all", description='SKU IDs to forecast, or "all"')
+    days: int = Field(default=7, ge=1, description="Number of days to forecast")
+    format: ResponseFormat = Field(default="rows", description="Per-day dicts, or one array per field")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "sku_ids": ["SKU-001", "SKU-002"],
+                "days": 7,
+            }
+        }
+
+
+
 # REPLENISHMENT MODELS - Pydantic models for replenishment feature
 
 
@@ -103,70 +168,149 @@ class ReplenishmentRecommendation(BaseModel):
     reorder_point: int
     safety_stock: int
     target_stock_level: int
-    suggested_order_date: str = None
-    expected_arrival_date: str = None
+    suggested_order_date: Optional[str] = None
+    expected_arrival_date: Optional[str] = None
     message: str
 
 
-models = joblib.load("../backend/models.pkl")
-
-FEATURES = [
-    "day_of_week", "month", "day_of_month",
-    "day_of_year", "is_weekend", "week_of_year",
-]
+MODEL_DIR = os.getenv("MODEL_DIR", "../backend/models")
 
+# Predictions only depend on (sku_id, today, horizon), so repeated dashboard
+# reads for the same SKU are served from memory for the rest of the day.
+forecast_cache = ForecastCache(max_entries=int(os.getenv("FORECAST_CACHE_SIZE", "4096")))
 
-@app.get("/")
-def home():
-    return {"message": "Inventory Forecast API Running"}
+# Per-SKU forests are loaded on first use and kept in a bounded LRU, so
+# memory follows the working set rather than the catalog. The registry
+# picks up newly trained versions without a restart; each request pins
+# `registry.current` once and uses that store throughout.
+registry = ModelRegistry(
+    MODEL_DIR,
+    max_models=int(os.getenv("MODEL_CACHE_SIZE", "256")),
+    poll_seconds=float(os.getenv("MODEL_POLL_SECONDS", "30")),
+    on_swap=forecast_cache.set_model_version,
+)
 
+# Upcoming monthly inventory_sales partitions are created ahead of time;
+# a transaction dated in a month without one is rejected
+partition_maintainer = PartitionMaintainer(
+    db.engine,
+    ahead_months=int(os.getenv("PARTITION_AHEAD_MONTHS", "3")),
+    poll_seconds=float(os.getenv("PARTITION_CHECK_SECONDS", "21600")),
+)
 
-@app.get("/skus")
-def skus():
-    return {"skus": get_all_skus()}
+# Cache counters are read from the caches themselves when /metrics is scraped
+METRICS.callback("forecast_cache_hits_total", "Forecast cache hits.",
+                 lambda: forecast_cache.hits, type="counter")
+METRICS.callback("forecast_cache_misses_total", "Forecast cache misses.",
+                 lambda: forecast_cache.misses, type="counter")
+METRICS.callback("forecast_cache_hit_ratio", "Forecast cache hits / lookups since start.",
+                 lambda: forecast_cache.stats()["hit_rate"])
+METRICS.callback("forecast_cache_entries", "Forecasts held in the cache.",
+                 lambda: forecast_cache.stats()["entries"])
+METRICS.callback("model_store_hits_total", "Model lookups served from the loaded LRU (active version).",
+                 lambda: registry.current.hits, type="counter")
+METRICS.callback("model_store_loads_total", "Model lookups that loaded an artifact (active version).",
+                 lambda: registry.current.loads, type="counter")
+METRICS.callback("model_store_hit_ratio", "Model store hits / lookups for the active version.",
+                 lambda: registry.current.hits / max(registry.current.hits + registry.current.loads, 1))
+METRICS.callback("model_store_loaded_models", "Models currently loaded in memory.",
+                 lambda: registry.current.stats()["loaded_models"])
+
+
+def compute_demand(store: ModelStore, sku_id: str, days: int, today: date, X_future: np.ndarray = None) -> np.ndarray:
+    """Demand for the `days` days after `today` (uncached).
+
+    Days covered by the version's precomputed forecasts are sliced from it;
+    the SKU's model only runs for days past the end of that range.
+    """
+    precomputed = store.precomputed_forecast(sku_id, today + timedelta(days=1), days)
+    n = len(precomputed)
+    if n == days:
+        return precomputed
+    X = X_future[n:] if X_future is not None else future_features(today + timedelta(days=n), days - n)
+    model = store[sku_id]
+    with MODEL_PREDICT_SECONDS.time("single"):
+        predicted = model.predict(X)
+    return np.concatenate([precomputed, np.maximum(predicted, 0.0)])
+
+
+def compute_demand_many(store: ModelStore, sku_ids: list[str], days: int, today: date) -> np.ndarray:
+    """compute_demand for several SKUs at once (uncached), shape (len(sku_ids), days).
+
+    SKUs fully covered by precomputed forecasts are sliced; the rest are
+    scored together through store.predict_many, which is a single predict
+    call when the version is a global model.
+    """
+    demand = np.empty((len(sku_ids), days))
+    to_score = []
+    for i, sku_id in enumerate(sku_ids):
+        precomputed = store.precomputed_forecast(sku_id, today + timedelta(days=1), days)
+        if len(precomputed) == days:
+            demand[i] = precomputed
+        else:
+            to_score.append(i)
+
+    if to_score:
+        X_future = future_features(today, days)
+        MODEL_PREDICT_BATCH_SKUS.observe(len(to_score))
+        with MODEL_PREDICT_SECONDS.time("many"):
+            scored = store.predict_many([sku_ids[i] for i in to_score], X_future)
+        demand[to_score] = np.maximum(scored, 0.0)
+    return demand
+
+
+def predict_demand_many(store: ModelStore, sku_ids: list[str], days: int) -> list[tuple]:
+    """Cached demand predictions for several SKUs, computing all cache misses in one batch."""
+    today = date.today()
+    results = {}
+    misses = []
+    for sku_id in sku_ids:
+        cached = forecast_cache.get(sku_id, days, today, store.version)
+        if cached is None:
+            misses.append(sku_id)
+        else:
+            results[sku_id] = cached
+
+    if misses:
+        demand = compute_demand_many(store, misses, days, today)
+        for sku_id, row in zip(misses, demand):
+            results[sku_id] = forecast_cache.put(sku_id, days, row, today, store.version)
+    return [results[sku_id] for sku_id in sku_ids]
+
+
+async def predict_demand_async(store: ModelStore, sku_id: str, days: int) -> tuple:
+    """Cached demand predictions for one SKU; cache hits and precomputed ranges are answered inline.
+
+    Only requests that need the model are sent to the executor.
+    """
+    today = date.today()
+    cached = forecast_cache.get(sku_id, days, today, store.version)
+    if cached is not None:
+        return cached
+    precomputed = store.precomputed_forecast(sku_id, today + timedelta(days=1), days)
+    if len(precomputed) == days:
+        return forecast_cache.put(sku_id, days, precomputed, today, store.version)
+    loop = asyncio.get_running_loop()
+    predictions = await loop.run_in_executor(predict_executor, compute_demand, store, sku_id, days, today)
+    return forecast_cache.put(sku_id, days, predictions, today, store.version)
 
 
-@app.get("/history")
-def history(sku_id: str = Query(...), days: int = Query(7)):
-    rows = db_get_history(sku_id, days)
-    current_stock = get_current_stock(sku_id)
-    return {"sku_id": sku_id, "days": days, "history": rows, "current_stock": current_stock}
+async def predict_demand_many_async(store: ModelStore, sku_ids: list[str], days: int) -> list[tuple]:
+    """predict_demand_many on the executor, as one task for the whole batch."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(predict_executor, predict_demand_many, store, sku_ids, days)
 
 
-@app.get("/forecast")
-def forecast(sku_id: str = Query(...), days: int = Query(7)):
-    if sku_id not in models:
-        return {"error": f"No model found for {sku_id}"}
+def build_forecast_payload(sku_id: str, predictions, current_stock: int, today: date, columnar: bool = False) -> dict:
+    """Shape predictions into the /forecast response for one SKU.
 
-    model = models[sku_id]
-    today = date.today()
+    With columnar=True, `forecast` is {"date": [...], "predicted_sales": [...]}
+    instead of a list of per-day dicts.
+    """
+    dates = [(today + timedelta(days=i + 1)).strftime("%Y-%m-%d") for i in range(len(predictions))]
+    sales = [round(pred, 2) for pred in predictions]
+    total_demand = sum(sales)
 
-    future_dates = [today + timedelta(days=i) for i in range(1, days + 1)]
-    rows = []
-    for d in future_dates:
-        rows.append({
-            "day_of_week":  d.weekday(),
-            "month":        d.month,
-            "day_of_month": d.day,
-            "day_of_year":  d.timetuple().tm_yday,
-            "is_weekend":   1 if d.weekday() >= 5 else 0,
-            "week_of_year": d.isocalendar()[1],
-        })
-
-    X_future = pd.DataFrame(rows)[FEATURES]
-    predictions = model.predict(X_future)
-
-    result = []
-    total_demand = 0
-    for i, d in enumerate(future_dates):
-        sales = max(0, round(float(predictions[i]), 2))
-        total_demand += sales
-        result.append({
-            "date": d.strftime("%Y-%m-%d"),
-            "predicted_sales": sales,
-        })
-
-    current_stock = get_current_stock(sku_id)
     if current_stock < total_demand:
         stock_status = "REORDER NOW"
     elif current_stock < total_demand * 1.2:
@@ -174,17 +318,257 @@ def forecast(sku_id: str = Query(...), days: int = Query(7)):
     else:
         stock_status = "STOCK OK"
 
+    if columnar:
+        forecast = {"date": dates, "predicted_sales": sales}
+    else:
+        forecast = [{"date": d, "predicted_sales": p} for d, p in zip(dates, sales)]
+
     return {
         "sku_id": sku_id,
         "current_stock": current_stock,
         "total_forecast_demand": round(total_demand, 2),
         "stock_status": stock_status,
-        "forecast": result,
+        "forecast": forecast,
     }
 
 
+@app.get("/")
+async def home():
+    return {"message": "Inventory Forecast API Running"}
+
+
+@app.get("/skus")
+async def skus():
+    return {"skus": await get_all_skus()}
+
+
+# Days per bucket, to turn a `days` span into a bucket count
+GRANULARITY_DAYS = {"day": 1, "week": 7, "month": 30}
+HISTORY_FIELDS = ["date", "sales_qty", "purchase_qty", "stock_level"]
+
+
+@app.get("/history")
+async def history(
+    sku_id: str = Query(...),
+    days: int = Query(7, ge=1),
+    granularity: Literal["day", "week", "month"] = Query("day"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = Query(None),
+    response_format: ResponseFormat = Query("rows", alias="format"),
+):
+    """
+    Sales history for a SKU, newest page first, oldest-first within a page.
+
+    With granularity week or month, sales and purchases are summed per
+    calendar bucket in SQL and stock_level is the bucket's closing stock,
+    so the payload follows the number of buckets rather than rows stored.
+
+    Parameters:
+    - sku_id: Stock Keeping Unit ID
+    - days: Span to cover; the page holds `days` rows, or enough weeks/months to span them
+    - granularity: day (raw rows), week or month
+    - limit: Rows or buckets per page (overrides `days`)
+    - cursor: `next_cursor` from the previous page, to continue further back
+    - format: rows (list of dicts) or columnar (one array per field)
+    """
+    if limit is None:
+        limit = math.ceil(days / GRANULARITY_DAYS[granularity])
+    try:
+        page, current_stock = await asyncio.gather(
+            get_history_page(sku_id, limit, granularity, cursor),
+            get_current_stock(sku_id),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    rows = page["history"]
+    if response_format == "columnar":
+        fields = HISTORY_FIELDS if granularity == "day" else HISTORY_FIELDS + ["records"]
+        rows = to_columns(rows, fields)
+    return FastJSONResponse({
+        "sku_id": sku_id,
+        "days": days,
+        "granularity": granularity,
+        "history": rows,
+        "next_cursor": page["next_cursor"],
+        "current_stock": current_stock,
+    })
+
+
+@app.get("/forecast")
+async def forecast(
+    sku_id: str = Query(...),
+    days: int = Query(7),
+    response_format: ResponseFormat = Query("rows", alias="format"),
+):
+    store = registry.current
+    if sku_id not in store:
+        return {"error": f"No model found for {sku_id}"}
+
+    today = date.today()
+    predictions, current_stock = await asyncio.gather(
+        predict_demand_async(store, sku_id, days),
+        get_current_stock(sku_id),
+    )
+    return FastJSONResponse(
+        build_forecast_payload(sku_id, predictions, current_stock, today, columnar=response_format == "columnar")
+    )
+
+
+@app.post("/forecast/batch")
+async def forecast_batch(request: BatchForecastRequest):
+    """
+    Forecast many SKUs in one call.
+
+    Builds the feature matrix once, scores every uncached SKU in one batch
+    (a single predict call for a global model) and reads every current
+    stock level in a single query. Each entry in `forecasts`
+    has the same shape as the /forecast response.
+
+    Parameters:
+    - sku_ids: List of SKU IDs, or "all" for every SKU with a model
+    - days: Number of days to forecast
+    - format: rows (list of per-day dicts) or columnar (one array per field)
+    """
+    store = registry.current
+    if request.sku_ids == "all":
+        sku_ids = sorted(store)
+    else:
+        sku_ids = list(dict.fromkeys(request.sku_ids))
+
+    found = [s for s in sku_ids if s in store]
+    missing = [s for s in sku_ids if s not in store]
+
+    today = date.today()
+    if found:
+        predictions, stocks = await asyncio.gather(
+            predict_demand_many_async(store, found, request.days),
+            get_current_stocks(None if request.sku_ids == "all" else found),
+        )
+    else:
+        predictions, stocks = [], {}
+
+    columnar = request.format == "columnar"
+    forecasts = [
+        build_forecast_payload(sku_id, preds, stocks.get(sku_id, 0), today, columnar=columnar)
+        for sku_id, preds in zip(found, predictions)
+    ]
+
+    return FastJSONResponse({
+        "days": request.days,
+        "count": len(forecasts),
+        "forecasts": forecasts,
+        "missing": missing,
+    })
+
+
+# ── Bulk export ─────────────────────────────────────────────────
+
+# Exports stream from a psycopg2 server-side cursor, on Starlette's threadpool
+instrument_engine(db.engine)
+
+
+def export_response(chunks, fmt: str, name: str) -> StreamingResponse:
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+
+@app.get("/export/ledger")
+def export_ledger(
+    sku_id: Optional[list[str]] = Query(None),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    export_format: Literal["arrow", "parquet"] = Query("arrow", alias="format"),
+    batch_rows: int = Query(65536, ge=1000, le=1_000_000),
+):
+    """
+    Stream inventory_sales rows as an Arrow IPC stream or a Parquet file.
+
+    Rows are read through a server-side cursor and encoded one batch at a
+    time, so memory use does not grow with the size of the export.
+
+    Parameters:
+    - sku_id: Only these SKUs (repeatable; all SKUs if omitted)
+    - start / end: Inclusive sale_date range (YYYY-MM-DD; open-ended if omitted)
+    - format: arrow (IPC stream, zstd-compressed buffers) or parquet
+    - batch_rows: Rows per record batch / Parquet row group
+    """
+    batches = ledger_batches(db.engine, sku_id, start, end, batch_rows)
+    chunks = encode_stream(batches, LEDGER_SCHEMA, export_format)
+    return export_response(chunks, export_format, "inventory_sales")
+
+
+@app.get("/export/forecasts")
+def export_forecasts(
+    sku_id: Optional[list[str]] = Query(None),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    export_format: Literal["arrow", "parquet"] = Query("arrow", alias="format"),
+    batch_rows: int = Query(65536, ge=1000, le=1_000_000),
+):
+    """
+    Stream the active model version's precomputed forecasts, one row per
+    SKU and date, as an Arrow IPC stream or a Parquet file.
+
+    The model version is stored in the schema metadata (`model_version`).
+
+    Parameters:
+    - sku_id: Only these SKUs (repeatable; every SKU with forecasts if omitted)
+    - start / end: Inclusive forecast date range (the whole precomputed range if omitted)
+    - format: arrow or parquet
+    - batch_rows: Approximate rows per record batch / Parquet row group
+    """
+    store = registry.current
+    if store.precomputed_forecasts() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model version {store.version} has no precomputed forecasts"
+        )
+    batches = forecast_batches(store, sku_id, start, end, batch_rows)
+    chunks = encode_stream(batches, FORECAST_SCHEMA, export_format, metadata={"model_version": store.version})
+    return export_response(chunks, export_format, f"forecasts-{store.version}")
+
+
+@app.get("/forecast-cache/stats")
+async def forecast_cache_stats():
+    """Hit/miss counters and occupancy of the in-process forecast cache."""
+    return forecast_cache.stats()
+
+
+@app.get("/models/stats")
+async def model_store_stats():
+    """Loaded models, LRU counters and memory use of the model store."""
+    return registry.current.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Request, query, pool, predict and cache metrics in the Prometheus text format."""
+    return Response(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/model-version")
+async def model_version():
+    """Active model version, when it was loaded and reload history."""
+    return registry.info()
+
+
+@app.post("/model-version/reload")
+async def reload_models():
+    """Check for a newly trained model version now instead of waiting for the next poll."""
+    loop = asyncio.get_running_loop()
+    swapped = await loop.run_in_executor(None, registry.check_for_update)
+    return {"swapped": swapped, **registry.info()}
+
+
 @app.post("/record-transaction", status_code=status.HTTP_201_CREATED)
-def record_sale_purchase(transaction: TransactionRequest):
+async def record_sale_purchase(transaction: TransactionRequest):
     """
     Record a sales or purchase transaction for an SKU.
     
@@ -205,7 +589,7 @@ def record_sale_purchase(transaction: TransactionRequest):
                 detail="Either sales_qty or purchase_qty must be greater than 0"
             )
         
-        result = record_transaction(
+        result = await record_transaction(
             sku_id=transaction.sku_id,
             sales_qty=transaction.sales_qty,
             purchase_qty=transaction.purchase_qty,
@@ -225,12 +609,61 @@ def record_sale_purchase(transaction: TransactionRequest):
         )
 
 
+@app.post("/record-transactions/bulk")
+async def record_transactions_bulk_endpoint(request: BulkTransactionRequest):
+    """
+    Record a batch of sales/purchase transactions across many SKUs.
+    
+    Lines are applied in order with stock running forward per SKU. Lines
+    that would take stock negative (or name an unknown SKU) are rejected
+    individually; everything else is written in a single database
+    transaction. Returns one result per line.
+    
+    Parameters:
+    - transactions: List of {sku_id, sales_qty, purchase_qty, transaction_date}
+    """
+    lines = [t.model_dump() for t in request.transactions]
+    try:
+        results = [None] * len(lines)
+        valid = []
+        for i, line in enumerate(lines):
+            if line["sales_qty"] == 0 and line["purchase_qty"] == 0:
+                results[i] = {
+                    "line": i,
+                    "sku_id": line["sku_id"],
+                    "sale_date": line["transaction_date"],
+                    "sales_qty": line["sales_qty"],
+                    "purchase_qty": line["purchase_qty"],
+                    "status": "rejected",
+                    "error": "Either sales_qty or purchase_qty must be greater than 0",
+                }
+            else:
+                valid.append(i)
+
+        for i, result in zip(valid, await record_transactions_bulk([lines[i] for i in valid])):
+            result["line"] = i
+            results[i] = result
+
+        recorded = sum(1 for r in results if r["status"] == "recorded")
+        return {
+            "recorded": recorded,
+            "rejected": len(results) - recorded,
+            "results": results,
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error recording transactions: {str(e)}"
+        )
+
+
 # ============================================================================
 # REPLENISHMENT ENDPOINTS - NEW functionality for stock replenishment recommendations
 # ============================================================================
 
 @app.get("/replenishment-settings/{sku_id}")
-def get_replenishment_settings_endpoint(sku_id: str):
+async def get_replenishment_settings_endpoint(sku_id: str):
     """
     Get replenishment settings for a SKU.
     
@@ -240,7 +673,7 @@ def get_replenishment_settings_endpoint(sku_id: str):
     - sku_id: Stock Keeping Unit ID
     """
     try:
-        settings = get_replenishment_settings(sku_id)
+        settings = await get_replenishment_settings(sku_id)
         return settings
     except Exception as e:
         raise HTTPException(
@@ -250,7 +683,7 @@ def get_replenishment_settings_endpoint(sku_id: str):
 
 
 @app.post("/replenishment-settings/{sku_id}", status_code=status.HTTP_201_CREATED)
-def set_replenishment_settings_endpoint(sku_id: str, settings: ReplenishmentSettingsUpdate):
+async def set_replenishment_settings_endpoint(sku_id: str, settings: ReplenishmentSettingsUpdate):
     """
     Set or update replenishment settings for a SKU.
     
@@ -266,7 +699,7 @@ def set_replenishment_settings_endpoint(sku_id: str, settings: ReplenishmentSett
             "safety_stock": settings.safety_stock,
             "target_stock_level": settings.target_stock_level,
         }
-        result = set_replenishment_settings(sku_id, settings_dict)
+        result = await set_replenishment_settings(sku_id, settings_dict)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -281,7 +714,7 @@ def set_replenishment_settings_endpoint(sku_id: str, settings: ReplenishmentSett
 
 
 @app.get("/replenishment-recommendation", response_model=ReplenishmentRecommendation)
-def replenishment_recommendation(sku_id: str = Query(...), days: int = Query(14)):
+async def replenishment_recommendation(sku_id: str = Query(...), days: int = Query(14)):
     """
     Generate a stock replenishment recommendation for a SKU.
     
@@ -297,40 +730,24 @@ def replenishment_recommendation(sku_id: str = Query(...), days: int = Query(14)
     """
     try:
         # Validate SKU has a model
-        if sku_id not in models:
+        store = registry.current
+        if sku_id not in store:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"No forecast model found for SKU '{sku_id}'"
             )
         
-        # Get current stock
-        current_stock = get_current_stock(sku_id)
-        
-        # Get replenishment settings
-        rep_settings = get_replenishment_settings(sku_id)
+        # Get current stock and replenishment settings
+        current_stock, rep_settings = await asyncio.gather(
+            get_current_stock(sku_id),
+            get_replenishment_settings(sku_id),
+        )
         
         # Generate forecast (ensure we forecast far enough ahead)
         forecast_days = max(days, rep_settings["lead_time_days"] + 7)
-        model = models[sku_id]
-        today = date.today()
-        
-        future_dates = [today + timedelta(days=i) for i in range(1, forecast_days + 1)]
-        rows = []
-        for d in future_dates:
-            rows.append({
-                "day_of_week": d.weekday(),
-                "month": d.month,
-                "day_of_month": d.day,
-                "day_of_year": d.timetuple().tm_yday,
-                "is_weekend": 1 if d.weekday() >= 5 else 0,
-                "week_of_year": d.isocalendar()[1],
-            })
-        
-        X_future = pd.DataFrame(rows)[FEATURES]
-        predictions = model.predict(X_future)
         
         # Extract forecasted sales for the lead time period
-        forecasted_demand = [max(0, float(pred)) for pred in predictions]
+        forecasted_demand = list(await predict_demand_async(store, sku_id, forecast_days))
         
         # Calculate recommendation
         recommendation = ReplenishmentRecommendationEngine.calculate_recommendation(
@@ -360,5 +777,69 @@ def replenishment_recommendation(sku_id: str = Query(...), days: int = Query(14)
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating recommendation: {str(e)}"
         )
-    
 
+
+@app.get("/replenishment-recommendations")
+async def replenishment_recommendations(days: int = Query(14, ge=1)):
+    """
+    Scan every SKU with a model and return those that need a reorder.
+
+    Forecasts, stock levels and settings are gathered for the whole fleet
+    (one query each) and the recommendation rules are applied to all SKUs
+    at once. Results are sorted by urgency, then by projected stock.
+
+    Parameters:
+    - days: Number of days to forecast (default: 14, extended per SKU to lead_time_days + 7)
+    """
+    try:
+        store = registry.current
+        sku_ids = sorted(store)
+        if not sku_ids:
+            return {"count": 0, "scanned": 0, "recommendations": []}
+
+        stocks, settings = await asyncio.gather(
+            get_current_stocks(None),
+            get_all_replenishment_settings(sku_ids),
+        )
+
+        lead_time_days = np.array([settings[s]["lead_time_days"] for s in sku_ids])
+        forecast_days = max(days, int(lead_time_days.max()) + 7)
+        demand = np.vstack(await predict_demand_many_async(store, sku_ids, forecast_days))
+
+        fleet = ReplenishmentRecommendationEngine.calculate_fleet_recommendations(
+            current_stock=np.array([stocks.get(s, 0) for s in sku_ids]),
+            forecasted_demand=demand,
+            lead_time_days=lead_time_days,
+            min_order_qty=np.array([settings[s]["min_order_qty"] for s in sku_ids]),
+            reorder_point=np.array([settings[s]["reorder_point"] for s in sku_ids]),
+            safety_stock=np.array([settings[s]["safety_stock"] for s in sku_ids]),
+            target_stock_level=np.array([settings[s]["target_stock_level"] for s in sku_ids]),
+        )
+
+        needing = np.flatnonzero(fleet["reorder_needed"])
+        needing = sorted(
+            needing,
+            key=lambda i: (URGENCY_RANK[fleet["urgency"][i]], fleet["projected_stock_at_lead_time"][i]),
+        )
+
+        recommendations = [
+            {"sku_id": sku_ids[i], **ReplenishmentRecommendationEngine.fleet_recommendation(fleet, i)}
+            for i in needing
+        ]
+
+        return {
+            "count": len(recommendations),
+            "scanned": len(sku_ids),
+            "recommendations": recommendations,
+        }
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating recommendations: {str(e)}"
+        )
@@ -0,0 +1,250 @@
+"""
+Process-local metrics, exposed at /metrics in the Prometheus text format.
+
+Histograms and counters are plain Python objects updated in place (a lock
+and a bisect per observation), so instrumenting a hot path costs on the
+order of a microsecond. Values that already exist elsewhere — cache
+counters, pool occupancy — are not duplicated: they are read through
+callbacks when /metrics is scraped.
+
+Instrumented here:
+  - MetricsMiddleware: latency and status of every HTTP request, by route
+  - instrument_engine: time of every SQL statement, by the `query_name`
+    execution option each db.py query carries
+and in the modules that own the work: pool checkout wait (db_async) and
+model predict time and batch size (main).
+
+Each worker process keeps its own metrics; scrape every worker.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# Request and query latencies, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SKUs per predict_many call
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per combination of label values."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(float(b) for b in buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the wall time of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        lines = []
+        for values, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter, one series per combination of label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values) -> None:
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        return [f"{self.name}{_labels(self.labels, values)} {_number(v)}" for values, v in snapshot]
+
+
+class Callback:
+    """Gauge or counter whose values are read from `fn` at scrape time.
+
+    `fn` returns {label_values_tuple: value}, or a bare number when the
+    metric has no labels.
+    """
+
+    def __init__(self, name: str, help: str, fn, type: str = "gauge", labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.type = type
+        self.labels = tuple(labels)
+
+    def samples(self) -> list[str]:
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in values.items()]
+
+
+class MetricsRegistry:
+    """Named metrics, rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def callback(self, name: str, help: str, fn, type: str = "gauge", labels: tuple = ()) -> Callback:
+        return self.register(Callback(name, help, fn, type, labels))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    labels=("method", "route"),
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP responses by route and status code.", labels=("method", "route", "status"),
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_duration_seconds", "Execution time of each named SQL statement (cursor execute to result).",
+    labels=("query",),
+)
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the async pool, pre-ping included.",
+)
+MODEL_PREDICT_SECONDS = REGISTRY.histogram(
+    "model_predict_duration_seconds", "Model predict calls: one SKU, or a batch through predict_many.",
+    labels=("call",),
+)
+MODEL_PREDICT_BATCH_SKUS = REGISTRY.histogram(
+    "model_predict_batch_skus", "SKUs scored per predict_many call.", buckets=BATCH_BUCKETS,
+)
+
+
+# ── HTTP ────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template.
+
+    Requests are labelled by the matched route's path ("/replenishment-settings/{sku_id}"),
+    not the raw URL, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route)
+            HTTP_REQUESTS.inc(1, scope["method"], route, str(status))
+
+
+# ── SQL ─────────────────────────────────────────────────────────
+
+def instrument_engine(engine) -> None:
+    """Time every statement `engine` executes, labelled by its `query_name`
+    execution option ("other" for statements without one).
+
+    Pass `async_engine.sync_engine` for an AsyncEngine.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            name = context.execution_options.get("query_name", "other")
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, name)
@@ -0,0 +1,264 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once, in its own transaction, and is recorded in the
+schema_migrations table. Migrations are written with IF NOT EXISTS so a
+database created by the old load_to_db.py can adopt them in place.
+
+Usage (from backend_api/):
+    python migrations.py            # apply pending migrations
+    python migrations.py status     # list applied / pending migrations
+"""
+
+import argparse
+
+from sqlalchemy import text
+
+from partitions import CREATE_PARTITION_FUNCTION, PARTITION_AHEAD_MONTHS, partitioned_table_statements
+from rollups import ROLLUP_COLUMNS, ROLLUP_TABLES, build_rollup_statements
+
+# Shared by the sku_catalog migration and backend/load_to_db.py
+REBUILD_SKU_CATALOG = """
+INSERT INTO sku_catalog (sku_id, sku_name, current_stock, total_records, last_sale_date, updated_at)
+SELECT d.sku_id, d.sku_name, d.stock_level, cnt.total_records, d.sale_date, NOW()
+FROM (
+    SELECT DISTINCT ON (sku_id) sku_id, sku_name, stock_level, sale_date
+    FROM inventory_sales
+    ORDER BY sku_id, sale_date DESC, id DESC
+) d
+INNER JOIN (
+    SELECT sku_id, COUNT(*)::int AS total_records
+    FROM inventory_sales
+    GROUP BY sku_id
+) cnt ON d.sku_id = cnt.sku_id
+ON CONFLICT (sku_id) DO UPDATE SET
+    sku_name       = EXCLUDED.sku_name,
+    current_stock  = EXCLUDED.current_stock,
+    total_records  = EXCLUDED.total_records,
+    last_sale_date = EXCLUDED.last_sale_date,
+    updated_at     = NOW()
+"""
+
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "create_inventory_sales",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS inventory_sales (
+                id          SERIAL PRIMARY KEY,
+                sku_id      VARCHAR(20)  NOT NULL,
+                sku_name    VARCHAR(100) NOT NULL,
+                sale_date   DATE         NOT NULL,
+                sales_qty   INTEGER      NOT NULL,
+                purchase_qty INTEGER     NOT NULL DEFAULT 0,
+                stock_level INTEGER      NOT NULL DEFAULT 0
+            )
+            """,
+        ],
+    },
+    {
+        "version": 2,
+        "name": "create_sku_catalog",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS sku_catalog (
+                sku_id         VARCHAR(20)  PRIMARY KEY,
+                sku_name       VARCHAR(100) NOT NULL,
+                current_stock  INTEGER      NOT NULL DEFAULT 0,
+                total_records  INTEGER      NOT NULL DEFAULT 0,
+                last_sale_date DATE,
+                updated_at     TIMESTAMP    NOT NULL DEFAULT NOW()
+            )
+            """,
+            REBUILD_SKU_CATALOG,
+        ],
+    },
+    {
+        # History, latest-stock and per-SKU scans all filter on sku_id and
+        # order by (sale_date, id); INCLUDE makes them index-only.
+        "version": 3,
+        "name": "inventory_sales_ledger_index",
+        "statements": [
+            """
+            CREATE INDEX IF NOT EXISTS ix_inventory_sales_sku_date_id
+            ON inventory_sales (sku_id, sale_date, id)
+            INCLUDE (sales_qty, purchase_qty, stock_level)
+            """,
+            "ANALYZE inventory_sales",
+        ],
+    },
+    {
+        "version": 4,
+        "name": "create_replenishment_settings",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS replenishment_settings (
+                sku_id             VARCHAR(20) PRIMARY KEY,
+                lead_time_days     INTEGER     NOT NULL CHECK (lead_time_days >= 1),
+                min_order_qty      INTEGER     NOT NULL CHECK (min_order_qty >= 1),
+                reorder_point      INTEGER     NOT NULL CHECK (reorder_point >= 0),
+                safety_stock       INTEGER     NOT NULL CHECK (safety_stock >= 0),
+                target_stock_level INTEGER     NOT NULL,
+                created_at         TIMESTAMP   NOT NULL DEFAULT NOW(),
+                updated_at         TIMESTAMP   NOT NULL DEFAULT NOW(),
+                CONSTRAINT ck_replenishment_settings_target
+                    CHECK (target_stock_level >= safety_stock)
+            )
+            """,
+        ],
+    },
+    {
+        "version": 5,
+        "name": "inventory_sales_constraints",
+        "statements": [
+            """
+            ALTER TABLE inventory_sales
+                ADD CONSTRAINT ck_inventory_sales_sales_qty CHECK (sales_qty >= 0),
+                ADD CONSTRAINT ck_inventory_sales_purchase_qty CHECK (purchase_qty >= 0),
+                ADD CONSTRAINT ck_inventory_sales_stock_level CHECK (stock_level >= 0)
+            """,
+            """
+            ALTER TABLE sku_catalog
+                ADD CONSTRAINT ck_sku_catalog_current_stock CHECK (current_stock >= 0)
+            """,
+        ],
+    },
+    {
+        # Daily/weekly/monthly per-SKU totals, kept current by the writers
+        # (see rollups.py) and backfilled here from the existing ledger
+        "version": 6,
+        "name": "create_sales_rollups",
+        "statements": [
+            *[f"CREATE TABLE IF NOT EXISTS {table} ({ROLLUP_COLUMNS})" for table in ROLLUP_TABLES.values()],
+            *[f"TRUNCATE {table}" for table in ROLLUP_TABLES.values()],
+            *build_rollup_statements(),
+            *[f"ANALYZE {table}" for table in ROLLUP_TABLES.values()],
+        ],
+    },
+    {
+        # Monthly range partitions on sale_date (see partitions.py). The
+        # ledger is copied into a partitioned table once; the primary key
+        # must include the partition key, so it becomes (id, sale_date).
+        "version": 7,
+        "name": "partition_inventory_sales",
+        "statements": [
+            CREATE_PARTITION_FUNCTION,
+            "ALTER TABLE inventory_sales RENAME TO inventory_sales_unpartitioned",
+            "ALTER TABLE inventory_sales_unpartitioned RENAME CONSTRAINT inventory_sales_pkey TO inventory_sales_unpartitioned_pkey",
+            "ALTER INDEX ix_inventory_sales_sku_date_id RENAME TO ix_inventory_sales_unpartitioned_sku_date_id",
+            *partitioned_table_statements("inventory_sales", like="inventory_sales_unpartitioned"),
+            f"""
+            SELECT create_sale_date_partitions(
+                'inventory_sales',
+                COALESCE((SELECT MIN(sale_date) FROM inventory_sales_unpartitioned), CURRENT_DATE),
+                GREATEST(
+                    (SELECT MAX(sale_date) FROM inventory_sales_unpartitioned),
+                    CAST(CURRENT_DATE + INTERVAL '{PARTITION_AHEAD_MONTHS} months' AS date)
+                )
+            )
+            """,
+            "INSERT INTO inventory_sales SELECT * FROM inventory_sales_unpartitioned",
+            "ALTER TABLE inventory_sales ADD CONSTRAINT inventory_sales_pkey PRIMARY KEY (id, sale_date)",
+            """
+            CREATE INDEX ix_inventory_sales_sku_date_id
+            ON inventory_sales (sku_id, sale_date, id)
+            INCLUDE (sales_qty, purchase_qty, stock_level)
+            """,
+            """
+            ALTER TABLE inventory_sales
+                ADD CONSTRAINT ck_inventory_sales_sales_qty CHECK (sales_qty >= 0),
+                ADD CONSTRAINT ck_inventory_sales_purchase_qty CHECK (purchase_qty >= 0),
+                ADD CONSTRAINT ck_inventory_sales_stock_level CHECK (stock_level >= 0)
+            """,
+            # The id sequence belongs to the old table; keep it before the drop
+            """
+            DO $$ BEGIN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY inventory_sales.id',
+                               pg_get_serial_sequence('inventory_sales_unpartitioned', 'id'));
+            END $$
+            """,
+            "DROP TABLE inventory_sales_unpartitioned",
+            "ANALYZE inventory_sales",
+        ],
+    },
+]
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version    INTEGER      PRIMARY KEY,
+    name       VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP    NOT NULL DEFAULT NOW()
+)
+"""
+
+# Arbitrary key so only one runner applies migrations at a time
+MIGRATION_LOCK_KEY = 724_001
+
+
+def _applied_versions(conn) -> dict[int, str]:
+    rows = conn.execute(text("SELECT version, applied_at FROM schema_migrations")).fetchall()
+    return {int(r[0]): str(r[1]) for r in rows}
+
+
+def apply_migrations(engine) -> list[dict]:
+    """
+    Apply every pending migration in version order.
+
+    Args:
+        engine: SQLAlchemy engine for the target database
+
+    Returns:
+        List of the migrations applied by this call (empty if up to date)
+    """
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_MIGRATIONS_TABLE))
+
+    applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            if migration["version"] in _applied_versions(conn):
+                continue
+            for statement in migration["statements"]:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": migration["version"], "name": migration["name"]},
+            )
+        applied.append({"version": migration["version"], "name": migration["name"]})
+    return applied
+
+
+def migration_status(engine) -> list[dict]:
+    """Return every known migration with whether (and when) it was applied."""
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_MIGRATIONS_TABLE))
+        applied = _applied_versions(conn)
+    return [
+        {
+            "version": m["version"],
+            "name": m["name"],
+            "applied": m["version"] in applied,
+            "applied_at": applied.get(m["version"]),
+        }
+        for m in sorted(MIGRATIONS, key=lambda m: m["version"])
+    ]
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        done = apply_migrations(engine)
+        for m in done:
+            print(f"  applied {m['version']:>3}  {m['name']}")
+        print(f"{len(done)} migration(s) applied.")
+    else:
+        for m in migration_status(engine):
+            state = f"applied {m['applied_at']}" if m["applied"] else "pending"
+            print(f"  {m['version']:>3}  {m['name']:<35} {state}")
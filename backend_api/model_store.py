@@ -0,0 +1,501 @@
+"""
+Per-SKU model artifacts and a lazy, bounded model store.
+
+Layout written by backend/train.py:
+
+    models/
+        manifest.json            -> points at the active version directory
+        20260101T020000Z/
+            SKU-001.joblib
+            SKU-002.joblib
+            ...
+            forecasts.npy        -> optional precomputed daily forecasts
+
+Each version lives in its own directory and manifest.json is replaced
+atomically, so a reader never sees a half-written model set. The API loads
+a SKU's forest only when it is first asked for, memory-mapped, and keeps at
+most `max_models` of them in an LRU. ModelRegistry watches manifest.json
+and swaps in new versions without a restart.
+
+Every model input is a function of the calendar, so train.py can also
+precompute each SKU's predictions for the days after training into
+forecasts.npy (float32, one row per SKU). The store serves forecasts from
+that array and only evaluates a model for days past its end.
+
+A version can instead hold a single global model (train.py --mode global)
+shared by every SKU:
+
+    20260101T020000Z/
+        global.joblib            -> one model, SKU features in the manifest
+
+The store then hands out a per-SKU view of that model for single-SKU
+callers, and predict_many scores a whole batch in one predict call.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from urllib.parse import quote
+
+import joblib
+import numpy as np
+
+from features import build_global_features
+
+MANIFEST_NAME = "manifest.json"
+FORECASTS_NAME = "forecasts.npy"
+GLOBAL_MODEL_NAME = "global.joblib"
+
+# manifest["kind"] values
+PER_SKU = "per_sku"
+GLOBAL = "global"
+
+_NO_FORECAST = np.empty(0)
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_filename(sku_id: str) -> str:
+    """File name for a SKU's model (SKU IDs are escaped to be path-safe)."""
+    return quote(sku_id, safe="") + ".joblib"
+
+
+def predict_shared(model, X: np.ndarray, codes, stats) -> np.ndarray:
+    """
+    Score several SKUs over the same dates with a global model in one call.
+
+    Args:
+        model: The fitted global model
+        X: Calendar features for the dates, shape (days, len(FEATURES))
+        codes: SKU codes, shape (n_skus,)
+        stats: sku_stats per SKU, shape (n_skus, 9)
+
+    Returns:
+        Raw predictions, shape (n_skus, days)
+    """
+    codes = np.asarray(codes)
+    days = X.shape[0]
+    rows = build_global_features(
+        np.tile(X, (len(codes), 1)),
+        np.repeat(codes, days),
+        np.repeat(np.asarray(stats, dtype=np.float64).reshape(len(codes), -1), days, axis=0),
+    )
+    return model.predict(rows).reshape(len(codes), days)
+
+
+class SharedModelView:
+    """One SKU's slice of a global model, with the per-SKU `predict(X)` interface."""
+
+    def __init__(self, model, code: int, stats):
+        self.model = model
+        self.code = code
+        self.stats = np.asarray(stats, dtype=np.float64)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return predict_shared(self.model, X, [self.code], [self.stats])[0]
+
+
+def read_manifest(root: str) -> dict:
+    """Load models/manifest.json."""
+    with open(os.path.join(root, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+class ModelSetWriter:
+    """Write one version of per-SKU artifacts and publish it with a manifest."""
+
+    def __init__(self, root: str, version: str = None, **metadata):
+        self.root = root
+        self.version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self.directory = os.path.join(root, self.version)
+        self.metadata = metadata
+        self.models = {}
+        self.forecasts = None
+        self.shared = None
+        os.makedirs(self.directory, exist_ok=False)
+
+    def path_for(self, sku_id: str) -> str:
+        """Where a SKU's artifact goes in this version (for writers in other processes).
+
+        Dump the model there uncompressed, so it can be memory-mapped.
+        """
+        return os.path.join(self.directory, artifact_filename(sku_id))
+
+    def register(self, sku_id: str, **info) -> None:
+        """Record an artifact already written to path_for(sku_id)."""
+        path = self.path_for(sku_id)
+        self.models[sku_id] = {"file": os.path.basename(path), "bytes": os.path.getsize(path), **info}
+
+    def add_shared(self, model) -> None:
+        """Save the global model that serves every SKU in this version."""
+        path = os.path.join(self.directory, GLOBAL_MODEL_NAME)
+        joblib.dump(model, path)
+        self.shared = {"file": GLOBAL_MODEL_NAME, "bytes": os.path.getsize(path)}
+
+    def describe(self, sku_id: str, **info) -> None:
+        """Record a SKU served by the global model (its code and SKU features)."""
+        self.models[sku_id] = info
+
+    def reuse(self, sku_id: str, previous: dict, **info) -> None:
+        """Carry a SKU's artifact over from a previous manifest without retraining.
+
+        The file is hard-linked where the filesystem allows, copied otherwise.
+        """
+        entry = previous["models"][sku_id]
+        src = os.path.join(self.root, previous["directory"], entry["file"])
+        dst = self.path_for(sku_id)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        entry = {k: v for k, v in entry.items() if k != "forecast_row"}
+        self.models[sku_id] = {**entry, "file": os.path.basename(dst), **info}
+
+    def add_forecasts(self, start: date, forecasts: dict) -> None:
+        """Save precomputed daily forecasts for the SKUs in this version.
+
+        Args:
+            start: Date of the first forecast day
+            forecasts: {sku_id: predictions}, all the same length
+        """
+        sku_ids = [s for s in sorted(forecasts) if s in self.models]
+        if not sku_ids:
+            return
+        matrix = np.vstack([forecasts[s] for s in sku_ids]).astype(np.float32)
+        np.save(os.path.join(self.directory, FORECASTS_NAME), matrix)
+        for row, sku_id in enumerate(sku_ids):
+            self.models[sku_id]["forecast_row"] = row
+        self.forecasts = {"file": FORECASTS_NAME, "start": start.isoformat(), "days": int(matrix.shape[1])}
+
+    def commit(self) -> dict:
+        """Atomically point manifest.json at this version and return the manifest."""
+        manifest = {
+            "version": self.version,
+            "directory": self.version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **self.metadata,
+            **({"global_model": self.shared} if self.shared else {}),
+            **({"forecasts": self.forecasts} if self.forecasts else {}),
+            "models": dict(sorted(self.models.items())),
+        }
+        tmp = os.path.join(self.root, MANIFEST_NAME + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.root, MANIFEST_NAME))
+        return manifest
+
+
+def prune_versions(root: str, keep: int = 3) -> list[str]:
+    """Delete all but the newest `keep` version directories (never the active one)."""
+    active = read_manifest(root)["directory"]
+    versions = sorted(
+        d for d in os.listdir(root)
+        if os.path.isdir(os.path.join(root, d))
+    )
+    removed = []
+    for d in versions[:-keep] if keep else versions:
+        if d != active:
+            shutil.rmtree(os.path.join(root, d))
+            removed.append(d)
+    return removed
+
+
+def _process_rss_bytes() -> int | None:
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ModelStore:
+    """
+    Dict-like view of one model version that loads SKUs on demand.
+
+    `sku_id in store`, `store[sku_id]`, `len(store)` and iteration work like
+    the old models dict; only the SKUs actually requested are held in
+    memory, up to `max_models`, evicting the least recently used.
+    """
+
+    def __init__(self, root: str, max_models: int = 256):
+        if max_models < 1:
+            raise ValueError("max_models must be >= 1")
+        self.root = root
+        self.max_models = max_models
+        self.manifest = read_manifest(root)
+        self.version = self.manifest["version"]
+        self.kind = self.manifest.get("kind", PER_SKU)
+        self.directory = os.path.join(root, self.manifest["directory"])
+        self._entries = self.manifest["models"]
+        self._forecast_info = self.manifest.get("forecasts")
+        self._forecasts = None
+        self._shared = None
+        self._loaded: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def __contains__(self, sku_id) -> bool:
+        return sku_id in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, sku_id: str):
+        return self.get(sku_id)
+
+    def get(self, sku_id: str):
+        """Return the SKU's model, loading it if needed. Raises KeyError if unknown."""
+        if sku_id not in self._entries:
+            raise KeyError(sku_id)
+        if self.kind == GLOBAL:
+            entry = self._entries[sku_id]
+            return SharedModelView(self.shared_model(), entry["code"], entry["stats"])
+
+        with self._lock:
+            model = self._loaded.get(sku_id)
+            if model is not None:
+                self._loaded.move_to_end(sku_id)
+                self.hits += 1
+                return model
+            load_lock = self._load_locks.setdefault(sku_id, threading.Lock())
+
+        # One thread loads a given SKU; others wait for it rather than
+        # loading the same artifact twice.
+        with load_lock:
+            with self._lock:
+                model = self._loaded.get(sku_id)
+                if model is not None:
+                    self._loaded.move_to_end(sku_id)
+                    self.hits += 1
+                    return model
+
+            started = datetime.now()
+            path = os.path.join(self.directory, self._entries[sku_id]["file"])
+            model = joblib.load(path, mmap_mode="r")
+            elapsed = (datetime.now() - started).total_seconds()
+
+            with self._lock:
+                self._loaded[sku_id] = model
+                self.loads += 1
+                self.load_seconds += elapsed
+                while len(self._loaded) > self.max_models:
+                    self._loaded.popitem(last=False)
+                    self.evictions += 1
+                self._load_locks.pop(sku_id, None)
+        return model
+
+    def shared_model(self):
+        """The version's global model, loaded on first use."""
+        model = self._shared
+        if model is not None:
+            with self._lock:
+                self.hits += 1
+            return model
+
+        with self._load_locks.setdefault(GLOBAL_MODEL_NAME, threading.Lock()):
+            if self._shared is None:
+                started = datetime.now()
+                model = joblib.load(os.path.join(self.directory, self.manifest["global_model"]["file"]))
+                elapsed = (datetime.now() - started).total_seconds()
+                with self._lock:
+                    self._shared = model
+                    self.loads += 1
+                    self.load_seconds += elapsed
+        return self._shared
+
+    def predict_many(self, sku_ids: list[str], X: np.ndarray) -> np.ndarray:
+        """
+        Raw predictions for several SKUs over the same dates.
+
+        A global version scores the whole batch in one predict call; a
+        per-SKU version runs each SKU's model in turn.
+
+        Returns:
+            Array of shape (len(sku_ids), len(X))
+        """
+        if not sku_ids:
+            return np.empty((0, X.shape[0]))
+        if self.kind == GLOBAL:
+            entries = [self._entries[s] for s in sku_ids]
+            return predict_shared(
+                self.shared_model(), X,
+                [e["code"] for e in entries],
+                [e["stats"] for e in entries],
+            )
+        return np.vstack([self.get(sku_id).predict(X) for sku_id in sku_ids])
+
+    def precomputed_forecast(self, sku_id: str, start: date, days: int) -> np.ndarray:
+        """
+        Precomputed predictions for `days` days beginning at `start`.
+
+        The result stops where the precomputed range ends, so it may be
+        shorter than `days`; it is empty if nothing covers `start`.
+        """
+        info = self._forecast_info
+        row = self._entries.get(sku_id, {}).get("forecast_row")
+        if info is None or row is None:
+            return _NO_FORECAST
+        offset = (start - date.fromisoformat(info["start"])).days
+        if offset < 0 or offset >= info["days"]:
+            return _NO_FORECAST
+
+        return np.array(self._forecast_matrix()[row, offset: offset + days], dtype=float)
+
+    def _forecast_matrix(self) -> np.ndarray:
+        """forecasts.npy, memory-mapped on first use."""
+        if self._forecasts is None:
+            with self._lock:
+                if self._forecasts is None:
+                    path = os.path.join(self.directory, self._forecast_info["file"])
+                    self._forecasts = np.load(path, mmap_mode="r")
+        return self._forecasts
+
+    def precomputed_forecasts(self) -> tuple | None:
+        """
+        The whole precomputed forecast range, for bulk readers.
+
+        Returns:
+            (start date, memory-mapped float32 matrix, {sku_id: row}), or
+            None if this version has no precomputed forecasts
+        """
+        if self._forecast_info is None:
+            return None
+        rows = {s: e["forecast_row"] for s, e in self._entries.items() if e.get("forecast_row") is not None}
+        return date.fromisoformat(self._forecast_info["start"]), self._forecast_matrix(), rows
+
+    def loaded_skus(self) -> list[str]:
+        """SKUs currently in memory, most recently used first."""
+        with self._lock:
+            return list(reversed(self._loaded))
+
+    def stats(self) -> dict:
+        """Report what is loaded and roughly how much memory it takes."""
+        with self._lock:
+            loaded = list(self._loaded)
+            shared_bytes = self.manifest.get("global_model", {}).get("bytes", 0)
+            return {
+                "version": self.version,
+                "kind": self.kind,
+                "catalog_models": len(self._entries),
+                "loaded_models": len(loaded),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "avg_load_ms": round(1000 * self.load_seconds / self.loads, 2) if self.loads else 0.0,
+                "loaded_artifact_bytes": sum(self._entries[s].get("bytes", 0) for s in loaded)
+                + (shared_bytes if self._shared is not None else 0),
+                "catalog_artifact_bytes": sum(e.get("bytes", 0) for e in self._entries.values()) + shared_bytes,
+                "process_rss_bytes": _process_rss_bytes(),
+                "forecasts_start": self._forecast_info["start"] if self._forecast_info else None,
+                "forecasts_days": self._forecast_info["days"] if self._forecast_info else 0,
+            }
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelStore and swaps in new versions as they appear.
+
+    A background thread polls manifest.json. When the version changes it
+    builds a ModelStore for the new version, preloads the SKUs that are hot
+    in the current one, then replaces `current` in a single assignment.
+    Callers take `registry.current` once per request, so requests already
+    running finish on the version they started with; the old store is freed
+    when the last of them lets go of it.
+    """
+
+    def __init__(self, root: str, max_models: int = 256, poll_seconds: float = 30.0, on_swap=None):
+        self.root = root
+        self.max_models = max_models
+        self.poll_seconds = poll_seconds
+        self.on_swap = on_swap
+        self.current = ModelStore(root, max_models=max_models)
+        self.loaded_at = datetime.now(timezone.utc)
+        self.previous_version = None
+        self.reloads = 0
+        self.last_checked_at = None
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.on_swap:
+            self.on_swap(self.current.version)
+
+    def check_for_update(self) -> bool:
+        """Load and activate the manifest's version if it is new. Returns True on a swap."""
+        with self._reload_lock:
+            self.last_checked_at = datetime.now(timezone.utc)
+            try:
+                version = read_manifest(self.root)["version"]
+                if version == self.current.version:
+                    self.last_error = None
+                    return False
+
+                old = self.current
+                new = ModelStore(self.root, max_models=self.max_models)
+                if new.kind == GLOBAL:
+                    new.shared_model()
+                for sku_id in old.loaded_skus()[: self.max_models]:
+                    if sku_id in new:
+                        new.get(sku_id)
+            except Exception as e:
+                # Keep serving the current version; try again next poll
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Model reload failed")
+                return False
+
+            self.current = new
+            self.previous_version = old.version
+            self.loaded_at = datetime.now(timezone.utc)
+            self.reloads += 1
+            self.last_error = None
+            if self.on_swap:
+                self.on_swap(new.version)
+            logger.info("Swapped models %s -> %s", old.version, new.version)
+            return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            self.check_for_update()
+
+    def start(self) -> None:
+        """Start the background watcher (no-op if polling is disabled or already running)."""
+        if self.poll_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background watcher."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def info(self) -> dict:
+        """Active version and reload history."""
+        store = self.current
+        return {
+            "version": store.version,
+            "created_at": store.manifest.get("created_at"),
+            "loaded_at": self.loaded_at.isoformat(),
+            "previous_version": self.previous_version,
+            "reloads": self.reloads,
+            "models": len(store),
+            "poll_seconds": self.poll_seconds,
+            "last_checked_at": self.last_checked_at.isoformat() if self.last_checked_at else None,
+            "last_error": self.last_error,
+        }
+
@@ -0,0 +1,328 @@
+"""
+Monthly range partitions of inventory_sales by sale_date, and retention.
+
+inventory_sales is partitioned by RANGE (sale_date), one partition per
+calendar month (inventory_sales_p202401 holds January 2024), contiguous
+from the oldest month kept to a few months ahead. Queries bounded on
+sale_date only touch the partitions they need, and the newest-first scans
+in db.py read partitions in order (an ordered Append) and stop as soon as
+the page is full.
+
+There is deliberately no DEFAULT partition on inventory_sales: one would
+have to be searched by every query that is not bounded on both sides and
+rules out the ordered Append. A write for a month without a partition —
+archived, or beyond the months created ahead — is rejected instead.
+bulk_load does use a DEFAULT partition on its staging table, to catch the
+months the file has that the ledger did not, and splits it up before the
+swap.
+
+Partitions are created by the create_sale_date_partitions() SQL function
+(installed by migration 7). If the table has a DEFAULT partition, rows for
+the new month are moved out of it before the ATTACH. The API keeps
+PARTITION_AHEAD_MONTHS months ready in the background
+(PartitionMaintainer); `ensure` below does the same from cron.
+
+Retention detaches whole partitions older than the kept window, after
+writing each one to a Parquet file; no DELETE, no bloat. The rollup tables
+and sku_catalog keep their totals for archived months (run rollups.py with
+--since for a window that is still in the ledger, not a full rebuild).
+Incremental training (backend/train.py) relies on this: its watermarks are
+sku_catalog's total_records and last_sale_date, which archiving does not
+change, rather than a count of the rows left in the ledger.
+
+Usage (from backend_api/):
+    python partitions.py                                # list partitions
+    python partitions.py ensure --ahead 3               # create upcoming months
+    python partitions.py retain --keep-months 24 --archive-dir ../data/archive
+"""
+
+import argparse
+import logging
+import os
+import re
+import threading
+from datetime import date
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "inventory_sales"
+PARTITION_AHEAD_MONTHS = 3
+
+# Installed by migration 7. Creates monthly partitions of `parent` for every
+# month from first_month to last_month that has none. If `parent` has a
+# DEFAULT partition, the month's rows are moved out of it first so the
+# ATTACH is accepted.
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_sale_date_partitions(parent regclass, first_month date, last_month date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month        date := date_trunc('month', first_month);
+    next_month   date;
+    part         text;
+    default_part regclass;
+    created      integer := 0;
+BEGIN
+    -- One creator per parent at a time (API workers, cron, bulk_load)
+    PERFORM pg_advisory_xact_lock(hashtext('create_sale_date_partitions:' || parent::text));
+
+    SELECT i.inhrelid::regclass INTO default_part
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = parent AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT';
+
+    WHILE month <= last_month LOOP
+        next_month := month + INTERVAL '1 month';
+        part := parent::text || '_p' || to_char(month, 'YYYYMM');
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+            IF default_part IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %s WHERE sale_date >= %L AND sale_date < %L RETURNING *)
+                     INSERT INTO %I SELECT * FROM moved',
+                    default_part, month, next_month, part);
+            END IF;
+            EXECUTE format('ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           parent, part, month, next_month);
+            created := created + 1;
+        END IF;
+        month := next_month;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after (or before, if negative) `day`'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partitioned_table_statements(table: str, like: str, default: bool = False) -> list[str]:
+    """Create `table` as an empty ledger partitioned by sale_date, shaped like `like`.
+
+    Keys, indexes and constraints are left to the caller, so they can be
+    built after the rows are in. With `default`, a `<table>_default`
+    partition takes rows for months that have no partition.
+    """
+    statements = [f"CREATE TABLE {table} (LIKE {like} INCLUDING DEFAULTS) PARTITION BY RANGE (sale_date)"]
+    if default:
+        statements.append(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    return statements
+
+
+def ensure_partitions(conn, first: date, last: date, parent: str = PARENT_TABLE) -> int:
+    """
+    Make sure `parent` has a partition for every month from `first` to `last`.
+
+    Args:
+        conn: Connection, inside a transaction
+        first: Any day of the first month
+        last: Any day of the last month
+        parent: Partitioned ledger table
+
+    Returns:
+        Number of partitions created
+    """
+    return conn.execute(
+        text("SELECT create_sale_date_partitions(CAST(:parent AS regclass), :first, :last)"),
+        {"parent": parent, "first": first, "last": last},
+    ).scalar()
+
+
+def ensure_future_partitions(engine, ahead_months: int = PARTITION_AHEAD_MONTHS, today: date | None = None) -> int:
+    """Create inventory_sales partitions from this month through `ahead_months` months ahead."""
+    today = today or date.today()
+    with engine.begin() as conn:
+        return ensure_partitions(conn, today, add_months(today, ahead_months))
+
+
+_BOUNDS = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+def list_partitions(conn, parent: str = PARENT_TABLE) -> list[dict]:
+    """
+    Partitions of `parent`, oldest first, a DEFAULT partition last.
+
+    Returns:
+        [{"name", "lower", "upper", "rows"}], bounds as dates (None for
+        DEFAULT), rows as the planner's estimate
+    """
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound, c.reltuples
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+    """), {"parent": parent}).fetchall()
+
+    partitions = []
+    for name, bound, reltuples in rows:
+        match = _BOUNDS.search(bound)
+        partitions.append({
+            "name": name,
+            "lower": date.fromisoformat(match.group(1)) if match else None,
+            "upper": date.fromisoformat(match.group(2)) if match else None,
+            "rows": max(int(reltuples), 0),
+        })
+    return sorted(partitions, key=lambda p: (p["lower"] is None, p["lower"] or date.min))
+
+
+# ── Retention ───────────────────────────────────────────────────
+
+def archive_partition(engine, table: str, path: str) -> int:
+    """
+    Write one partition to a Parquet file, streamed in batches.
+
+    The file is written beside `path` and renamed into place once complete.
+
+    Returns:
+        Rows written
+    """
+    # Deferred so migrations and bulk_load do not load pyarrow
+    from export import LEDGER_SCHEMA, encode_stream, ledger_batches
+
+    written = 0
+
+    def counted(batches):
+        nonlocal written
+        for batch in batches:
+            written += batch.num_rows
+            yield batch
+
+    partial = path + ".partial"
+    with open(partial, "wb") as f:
+        for chunk in encode_stream(counted(ledger_batches(engine, table=table)), LEDGER_SCHEMA, "parquet",
+                                   metadata={"source_table": table}):
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    return written
+
+
+def apply_retention(engine, keep_months: int, archive_dir: str, parent: str = PARENT_TABLE,
+                    today: date | None = None) -> list[dict]:
+    """
+    Archive and drop every monthly partition that ends before the kept window.
+
+    Each partition is written to `archive_dir/<partition>.parquet`, then
+    detached and dropped in one transaction — only if it still holds exactly
+    the rows archived. A partition that took a back-dated write meanwhile is
+    kept and retried on the next run.
+
+    Args:
+        engine: Synchronous SQLAlchemy engine
+        keep_months: Whole months kept before the current one
+        archive_dir: Directory for the Parquet files (created if missing)
+        parent: Partitioned ledger table
+        today: Reference date (defaults to today)
+
+    Returns:
+        [{"partition", "rows", "path"}] for each partition removed
+
+    Raises:
+        ValueError: If keep_months is negative
+    """
+    if keep_months < 0:
+        raise ValueError("keep_months must be >= 0")
+    cutoff = add_months(today or date.today(), -keep_months)
+    with engine.connect() as conn:
+        expired = [p for p in list_partitions(conn, parent) if p["upper"] is not None and p["upper"] <= cutoff]
+
+    os.makedirs(archive_dir, exist_ok=True)
+    removed = []
+    for partition in expired:
+        name = partition["name"]
+        path = os.path.join(archive_dir, f"{name}.parquet")
+        rows = archive_partition(engine, name, path)
+        with engine.begin() as conn:
+            # Hold off writers to this month while checking the archive is complete
+            conn.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+            remaining = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+            if remaining == rows:
+                conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+        if remaining != rows:
+            logger.warning("%s changed while archiving (%d rows, %d archived); kept", name, remaining, rows)
+            continue
+        removed.append({"partition": name, "rows": rows, "path": path})
+        logger.info("Archived %s (%d rows) to %s", name, rows, path)
+    return removed
+
+
+# ── Background maintenance ──────────────────────────────────────
+
+class PartitionMaintainer:
+    """Keeps upcoming monthly partitions created from a background thread."""
+
+    def __init__(self, engine, ahead_months: int = PARTITION_AHEAD_MONTHS, poll_seconds: float = 6 * 3600):
+        self.engine = engine
+        self.ahead_months = ahead_months
+        self.poll_seconds = poll_seconds
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> int:
+        """Create any missing partitions now. Returns the number created."""
+        try:
+            created = ensure_future_partitions(self.engine, self.ahead_months)
+        except Exception as e:
+            # Try again next poll; the months already created cover a while
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Partition maintenance failed")
+            return 0
+        self.last_error = None
+        if created:
+            logger.info("Created %d inventory_sales partition(s)", created)
+        return created
+
+    def _watch(self) -> None:
+        self.check()
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def start(self) -> None:
+        """Start the background thread (no-op if disabled or already running)."""
+        if self.poll_seconds <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Manage inventory_sales monthly partitions.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("status", help="List partitions (default)")
+    ensure = sub.add_parser("ensure", help="Create partitions for the coming months")
+    ensure.add_argument("--ahead", type=int, default=PARTITION_AHEAD_MONTHS, help="Months after this one")
+    retain = sub.add_parser("retain", help="Archive to Parquet and drop partitions older than the window")
+    retain.add_argument("--keep-months", type=int, required=True, help="Whole months kept before this one")
+    retain.add_argument("--archive-dir", default="../data/archive", help="Where the Parquet files go")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "ensure":
+        print(f"{ensure_future_partitions(engine, args.ahead)} partition(s) created.")
+    elif args.command == "retain":
+        removed = apply_retention(engine, args.keep_months, args.archive_dir)
+        for r in removed:
+            print(f"  {r['partition']:<28} {r['rows']:>10} rows -> {r['path']}")
+        print(f"{len(removed)} partition(s) archived.")
+    else:
+        with engine.connect() as conn:
+            for p in list_partitions(conn):
+                span = f"{p['lower']} .. {p['upper']}" if p["lower"] else "DEFAULT"
+                print(f"  {p['name']:<28} {span:<26} ~{p['rows']} rows")
@@ -6,6 +6,11 @@ Calculates optimal replenishment orders based on forecasted demand and inventory
 from datetime import date, timedelta
 from typing import Optional
 
+import numpy as np
+
+# Sort order for fleet results, most pressing first
+URGENCY_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+
 
 class ReplenishmentRecommendationEngine:
     """
@@ -105,8 +110,139 @@ class ReplenishmentRecommendationEngine:
         }
 
     @staticmethod
-    def _get_message(reorder_needed: bool, urgency: str, projected_stock: int, order_qty: int) -> str:
+    def calculate_fleet_recommendations(
+        current_stock,
+        forecasted_demand,
+        lead_time_days,
+        min_order_qty,
+        reorder_point,
+        safety_stock,
+        target_stock_level,
+    ) -> dict:
+        """
+        Calculate replenishment recommendations for many SKUs at once.
+
+        Applies the same rules as calculate_recommendation() with NumPy
+        arithmetic over the whole fleet instead of one SKU at a time.
+
+        Args:
+            current_stock: Array (n_skus,) of current inventory levels
+            forecasted_demand: Array (n_skus, n_days) of daily forecasted sales
+            lead_time_days: Array (n_skus,) of supplier lead times
+            min_order_qty: Array (n_skus,) of minimum order quantities
+            reorder_point: Array (n_skus,) of reorder points
+            safety_stock: Array (n_skus,) of safety stock levels
+            target_stock_level: Array (n_skus,) of target stock levels
+
+        Returns:
+            Dictionary of per-SKU arrays: reorder_needed, order_quantity,
+            urgency, projected_stock_at_lead_time, current_stock,
+            demand_during_lead_time, reorder_point, safety_stock,
+            target_stock_level, suggested_order_date, expected_arrival_date.
+            fleet_recommendation() turns one SKU's entries into the dict
+            calculate_recommendation() returns.
+        """
+        demand = np.asarray(forecasted_demand, dtype=np.float64)
+        if demand.ndim != 2:
+            raise ValueError("forecasted_demand must be a 2-D (SKUs x days) array")
+        n_skus, n_days = demand.shape
+
+        current_stock = np.asarray(current_stock, dtype=np.float64)
+        lead_time_days = np.asarray(lead_time_days, dtype=np.int64)
+        min_order_qty = np.asarray(min_order_qty, dtype=np.float64)
+        reorder_point = np.asarray(reorder_point, dtype=np.float64)
+        safety_stock = np.asarray(safety_stock, dtype=np.float64)
+        target_stock_level = np.asarray(target_stock_level, dtype=np.float64)
+        for name, arr in (
+            ("current_stock", current_stock),
+            ("lead_time_days", lead_time_days),
+            ("min_order_qty", min_order_qty),
+            ("reorder_point", reorder_point),
+            ("safety_stock", safety_stock),
+            ("target_stock_level", target_stock_level),
+        ):
+            if arr.shape != (n_skus,):
+                raise ValueError(f"{name} must have shape ({n_skus},)")
+
+        # Demand over the first min(lead_time + 7, n_days) days of each row
+        days_to_check = np.minimum(lead_time_days + 7, n_days)
+        cumulative = np.concatenate(
+            [np.zeros((n_skus, 1)), np.cumsum(demand, axis=1)], axis=1
+        )
+        demand_during_lead_time = cumulative[np.arange(n_skus), days_to_check]
+
+        projected_stock = current_stock - demand_during_lead_time
+        reorder_needed = projected_stock <= reorder_point
+
+        # Round up to the nearest min_order_qty multiple, as in the scalar path
+        units_needed = np.maximum(0.0, target_stock_level - projected_stock + safety_stock)
+        order_qty = np.floor_divide(units_needed + min_order_qty - 1, min_order_qty) * min_order_qty
+        order_qty = np.where(reorder_needed & (units_needed > 0), order_qty, 0.0)
+
+        urgency = np.select(
+            [~reorder_needed, projected_stock < safety_stock, projected_stock < reorder_point],
+            ["LOW", "CRITICAL", "HIGH"],
+            default="MEDIUM",
+        )
+
+        today = np.datetime64(date.today(), "D")
+        arrival = today + lead_time_days.astype("timedelta64[D]")
+        no_date = np.datetime64("NaT", "D")
+
+        return {
+            "reorder_needed": reorder_needed,
+            "order_quantity": order_qty.astype(np.int64),
+            "urgency": urgency,
+            "projected_stock_at_lead_time": projected_stock.astype(np.int64),
+            "current_stock": current_stock,
+            "demand_during_lead_time": np.round(demand_during_lead_time, 2),
+            "reorder_point": reorder_point,
+            "safety_stock": safety_stock,
+            "target_stock_level": target_stock_level,
+            "suggested_order_date": np.where(reorder_needed, today, no_date),
+            "expected_arrival_date": np.where(reorder_needed & (order_qty > 0), arrival, no_date),
+        }
+
+    @staticmethod
+    def fleet_recommendation(fleet: dict, i: int) -> dict:
+        """
+        One SKU's recommendation out of calculate_fleet_recommendations().
+
+        Args:
+            fleet: Result of calculate_fleet_recommendations()
+            i: Row of the SKU in the fleet arrays
+
+        Returns:
+            Dictionary with the same keys and values as calculate_recommendation()
+        """
+        reorder_needed = bool(fleet["reorder_needed"][i])
+        urgency = str(fleet["urgency"][i])
+        projected = int(fleet["projected_stock_at_lead_time"][i])
+        order_qty = int(fleet["order_quantity"][i])
+        order_date = fleet["suggested_order_date"][i]
+        arrival = fleet["expected_arrival_date"][i]
+        return {
+            "reorder_needed": reorder_needed,
+            "order_quantity": order_qty,
+            "urgency": urgency,
+            "projected_stock_at_lead_time": projected,
+            "current_stock": int(fleet["current_stock"][i]),
+            "demand_during_lead_time": float(fleet["demand_during_lead_time"][i]),
+            "reorder_point": int(fleet["reorder_point"][i]),
+            "safety_stock": int(fleet["safety_stock"][i]),
+            "target_stock_level": int(fleet["target_stock_level"][i]),
+            "suggested_order_date": None if np.isnat(order_date) else str(order_date),
+            "expected_arrival_date": None if np.isnat(arrival) else str(arrival),
+            "message": ReplenishmentRecommendationEngine._get_message(
+                reorder_needed, urgency, projected, order_qty
+            ),
+        }
+
+    @staticmethod
+    def _get_message(reorder_needed: bool, urgency: str, projected_stock: float, order_qty: float) -> str:
         """Generate human-readable recommendation message."""
+        # Whole units, truncated like projected_stock_at_lead_time
+        projected_stock, order_qty = int(projected_stock), int(order_qty)
         if not reorder_needed:
             return f"No reorder needed. Projected stock in lead time: {projected_stock} units."
 
@@ -0,0 +1,189 @@
+"""
+Response encoding: fast JSON, an opt-in columnar shape and compression.
+
+FastJSONResponse encodes with orjson (falling back to the standard json
+module if it is not installed). Endpoints with large payloads return it
+directly, which also skips FastAPI's jsonable_encoder pass over every row.
+
+Columnar payloads replace a list of per-row dicts with one array per field
+({"date": [...], "sales_qty": [...]}), which is smaller on the wire and
+can be handed to a chart as-is. Endpoints opt in per request
+(`format=columnar`); rows stay the default.
+
+CompressionMiddleware negotiates Accept-Encoding: brotli when the `brotli`
+package is installed and the client accepts it, otherwise gzip. Small
+responses and content that is already compressed are passed through.
+"""
+
+import json
+import zlib
+from typing import Literal
+
+import numpy as np
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Values of the `format` parameter on endpoints that can answer columnar
+ResponseFormat = Literal["rows", "columnar"]
+
+
+def _default(value):
+    """numpy values for the standard-library encoder."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Compact JSON bytes; numpy arrays and scalars are encoded natively."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def to_columns(rows: list[dict], fields: list[str]) -> dict[str, list]:
+    """[{"a": 1, "b": 2}, ...] -> {"a": [1, ...], "b": [2, ...]} for the given fields."""
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+# ── Compression ─────────────────────────────────────────────────
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) if self._br else self._gz.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit what has been buffered so far, so a streamed chunk reaches the client."""
+        return self._br.flush() if self._br else self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br else self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    A response is compressed when the client accepts an encoding, its
+    Content-Type is text-like or JSON, it has no Content-Encoding yet, and
+    it is at least `minimum_size` bytes (streamed responses are always
+    compressed, chunk by chunk).
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk decides
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    body = compressor.compress(body) + compressor.flush()
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            chunk = compressor.compress(body)
+            chunk += compressor.flush() if more_body else compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,173 @@
+"""
+Per-SKU daily, weekly and monthly rollups of the inventory_sales ledger.
+
+Each rollup table has one row per (sku_id, bucket) with summed sales and
+purchases, the number of ledger rows folded in, and the closing stock —
+the stock_level of the bucket's latest row by (sale_date, id). Weeks start
+on Monday (date_trunc).
+
+Rollups are kept current by the writers themselves: record_transaction and
+record_transactions_bulk fold their new rows in with rollup_upsert, in the
+same statement as the ledger insert, so they commit or roll back together.
+A back-dated row is added to its own bucket and only moves that bucket's
+closing stock if it is the bucket's latest row. bulk_load builds fresh
+rollups beside its staging table and swaps them in with the ledger.
+
+Usage (from backend_api/), after loading rows into inventory_sales by hand:
+    python rollups.py                          # rebuild everything
+    python rollups.py --since 2024-01-01       # only buckets from that date on
+    python rollups.py --sku SKU-001 --sku SKU-002
+
+Months archived by partitions.py retain are no longer in the ledger, so a
+full rebuild would drop their totals; use --since once retention has run.
+"""
+
+import argparse
+from datetime import date
+
+from sqlalchemy import text
+
+# granularity -> rollup table
+ROLLUP_TABLES = {
+    "day": "inventory_sales_daily",
+    "week": "inventory_sales_weekly",
+    "month": "inventory_sales_monthly",
+}
+
+ROLLUP_COLUMNS = """
+    sku_id         VARCHAR(20) NOT NULL,
+    bucket         DATE        NOT NULL,
+    sales_qty      BIGINT      NOT NULL,
+    purchase_qty   BIGINT      NOT NULL,
+    records        INTEGER     NOT NULL,
+    closing_stock  INTEGER     NOT NULL,
+    last_sale_date DATE        NOT NULL,
+    last_id        INTEGER     NOT NULL,
+    PRIMARY KEY (sku_id, bucket)
+"""
+
+
+def ledger_source(table: str = "inventory_sales", where: str = "") -> str:
+    """A rollup_upsert source over ledger rows (one record each)."""
+    return f"""(
+        SELECT id, sku_id, sale_date, sales_qty, purchase_qty, stock_level, 1 AS records
+        FROM {table} {where}
+    ) src"""
+
+
+def daily_source(table: str = ROLLUP_TABLES["day"], where: str = "") -> str:
+    """A rollup_upsert source over daily rollup rows, to derive weeks and months."""
+    return f"""(
+        SELECT last_id AS id, sku_id, last_sale_date AS sale_date, sales_qty, purchase_qty,
+               closing_stock AS stock_level, records
+        FROM {table} {where}
+    ) src"""
+
+
+def bucket_expr(granularity: str, column: str = "sale_date") -> str:
+    """SQL for the start of `column`'s day/week/month."""
+    if granularity == "day":
+        return column
+    return f"CAST(date_trunc('{granularity}', CAST({column} AS timestamp)) AS date)"
+
+
+def rollup_upsert(granularity: str, source: str, table: str = None) -> str:
+    """
+    INSERT ... ON CONFLICT folding `source` into one rollup table.
+
+    Args:
+        granularity: "day", "week" or "month"
+        source: Relation with id, sku_id, sale_date, sales_qty, purchase_qty,
+            stock_level and records columns (ledger_source, daily_source or
+            a CTE shaped like them)
+        table: Target table (defaults to the granularity's rollup table)
+
+    Returns:
+        A single INSERT statement, usable on its own or as a CTE
+    """
+    table = table or ROLLUP_TABLES[granularity]
+    newer = "(EXCLUDED.last_sale_date, EXCLUDED.last_id) > (r.last_sale_date, r.last_id)"
+    return f"""
+        INSERT INTO {table} AS r
+            (sku_id, bucket, sales_qty, purchase_qty, records, closing_stock, last_sale_date, last_id)
+        SELECT sku_id,
+               {bucket_expr(granularity)},
+               SUM(sales_qty),
+               SUM(purchase_qty),
+               SUM(records),
+               (array_agg(stock_level ORDER BY sale_date DESC, id DESC))[1],
+               MAX(sale_date),
+               (array_agg(id ORDER BY sale_date DESC, id DESC))[1]
+        FROM {source}
+        GROUP BY 1, 2
+        ON CONFLICT (sku_id, bucket) DO UPDATE SET
+            sales_qty      = r.sales_qty + EXCLUDED.sales_qty,
+            purchase_qty   = r.purchase_qty + EXCLUDED.purchase_qty,
+            records        = r.records + EXCLUDED.records,
+            closing_stock  = CASE WHEN {newer} THEN EXCLUDED.closing_stock ELSE r.closing_stock END,
+            last_id        = CASE WHEN {newer} THEN EXCLUDED.last_id ELSE r.last_id END,
+            last_sale_date = GREATEST(r.last_sale_date, EXCLUDED.last_sale_date)
+    """
+
+
+def build_rollup_statements(ledger: str = "inventory_sales", suffix: str = "") -> list[str]:
+    """Fill empty rollup tables (named with `suffix`) from a whole ledger table.
+
+    Days are aggregated from the ledger once; weeks and months from the days.
+    """
+    daily = ROLLUP_TABLES["day"] + suffix
+    return [
+        rollup_upsert("day", ledger_source(ledger), daily),
+        rollup_upsert("week", daily_source(daily), ROLLUP_TABLES["week"] + suffix),
+        rollup_upsert("month", daily_source(daily), ROLLUP_TABLES["month"] + suffix),
+    ]
+
+
+def rebuild_rollups(engine, sku_ids: list[str] | None = None, since: date | None = None) -> dict:
+    """
+    Recompute rollups from the ledger, e.g. after rows were backfilled
+    directly into inventory_sales.
+
+    Writers are blocked (SHARE lock on the ledger) while the affected
+    buckets are deleted and re-aggregated; readers are not.
+
+    Args:
+        engine: SQLAlchemy engine with migrations applied
+        sku_ids: Only these SKUs (all SKUs if None)
+        since: Only buckets containing or after this date (all if None)
+
+    Returns:
+        Rows written per rollup table
+    """
+    params = {"all_skus": sku_ids is None, "sku_ids": list(sku_ids or []), "since": since}
+    written = {}
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE inventory_sales IN SHARE MODE"))
+        for granularity, table in ROLLUP_TABLES.items():
+            lower = bucket_expr(granularity, "CAST(:since AS date)")
+            sku_filter = "(:all_skus OR sku_id = ANY(:sku_ids))"
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE {sku_filter} AND (:since IS NULL OR bucket >= {lower})"),
+                params,
+            )
+            if granularity == "day":
+                source = ledger_source(where=f"WHERE {sku_filter} AND (:since IS NULL OR sale_date >= {lower})")
+            else:
+                source = daily_source(where=f"WHERE {sku_filter} AND (:since IS NULL OR bucket >= {lower})")
+            written[table] = conn.execute(text(rollup_upsert(granularity, source)), params).rowcount
+        for table in ROLLUP_TABLES.values():
+            conn.execute(text(f"ANALYZE {table}"))
+    return written
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Rebuild the inventory_sales rollup tables.")
+    parser.add_argument("--sku", action="append", dest="sku_ids", help="Only this SKU (repeatable)")
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="Only buckets from this date (YYYY-MM-DD) on")
+    args = parser.parse_args()
+
+    for table, rows in rebuild_rollups(engine, sku_ids=args.sku_ids, since=args.since).items():
+        print(f"  {table:<28} {rows} rows")
@@ -0,0 +1,205 @@
+"""
+Concurrency stress test for the stock write path.
+
+Creates a throwaway SKU, hammers it from N parallel writers through
+db.record_transaction (and optionally db.record_transactions_bulk), then
+checks that:
+  - the catalog stock equals the seed stock plus every recorded purchase
+    minus every recorded sale,
+  - the ledger rows for the SKU form an unbroken stock chain in id order,
+  - stock never went negative,
+  - the daily rollup holds the same totals as the ledger.
+The SKU, its rows and its rollups are removed afterwards. Run against a
+scratch database.
+
+Usage (from backend_api/):
+    python stress_transactions.py --writers 16 --per-writer 200
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+import db
+from rollups import ROLLUP_TABLES, rollup_upsert
+
+STRESS_SKU = "STRESS-TEST"
+
+
+def seed(initial_stock: int) -> None:
+    with db.engine.begin() as conn:
+        cleanup(conn)
+        # The seed row goes into the rollups too, as record_transaction's rows do
+        rollup_ctes = ",\n".join(f"roll_{g} AS ({rollup_upsert(g, 'ins')})" for g in ROLLUP_TABLES)
+        conn.execute(text(f"""
+            WITH ins AS (
+                INSERT INTO inventory_sales (sku_id, sku_name, sale_date, sales_qty, purchase_qty, stock_level)
+                VALUES (:sku_id, 'Stress Test', :d, 0, :stock, :stock)
+                RETURNING id, sku_id, sale_date, sales_qty, purchase_qty, stock_level, 1 AS records
+            ),
+            {rollup_ctes}
+            SELECT COUNT(*) FROM ins
+        """), {"sku_id": STRESS_SKU, "d": date.today(), "stock": initial_stock})
+        conn.execute(text("""
+            INSERT INTO sku_catalog (sku_id, sku_name, current_stock, total_records, last_sale_date)
+            VALUES (:sku_id, 'Stress Test', :stock, 1, :d)
+        """), {"sku_id": STRESS_SKU, "d": date.today(), "stock": initial_stock})
+
+
+def cleanup(conn) -> None:
+    conn.execute(text("DELETE FROM inventory_sales WHERE sku_id = :sku_id"), {"sku_id": STRESS_SKU})
+    conn.execute(text("DELETE FROM sku_catalog WHERE sku_id = :sku_id"), {"sku_id": STRESS_SKU})
+    for table in ROLLUP_TABLES.values():
+        conn.execute(text(f"DELETE FROM {table} WHERE sku_id = :sku_id"), {"sku_id": STRESS_SKU})
+
+
+def writer(worker: int, per_writer: int, bulk_every: int, totals: list, errors: list,
+           start: threading.Barrier) -> None:
+    """Run one writer; its totals go to totals[worker], or an unexpected error to errors[worker]."""
+    try:
+        start.wait()
+        totals[worker] = _write(worker, per_writer, bulk_every)
+    except Exception as e:
+        # A DB error or deadlock is a failure to report, not a crash in verify()
+        errors[worker] = f"{type(e).__name__}: {e}"
+
+
+def _write(worker: int, per_writer: int, bulk_every: int) -> tuple:
+    rng = random.Random(worker)
+    purchased = sold = recorded = rejected = 0
+    today = str(date.today())
+
+    for i in range(per_writer):
+        if bulk_every and i % bulk_every == 0:
+            lines = [
+                {
+                    "sku_id": STRESS_SKU,
+                    "sales_qty": rng.randint(0, 5),
+                    "purchase_qty": rng.randint(0, 3),
+                    "transaction_date": today,
+                }
+                for _ in range(5)
+            ]
+            for r in db.record_transactions_bulk(lines):
+                if r["status"] == "recorded":
+                    purchased += r["purchase_qty"]
+                    sold += r["sales_qty"]
+                    recorded += 1
+                else:
+                    rejected += 1
+            continue
+
+        sales_qty, purchase_qty = (rng.randint(1, 5), 0) if rng.random() < 0.55 else (0, rng.randint(1, 5))
+        try:
+            db.record_transaction(STRESS_SKU, sales_qty, purchase_qty, today)
+            purchased += purchase_qty
+            sold += sales_qty
+            recorded += 1
+        except ValueError:
+            rejected += 1
+
+    return purchased, sold, recorded, rejected
+
+
+def verify(initial_stock: int, totals: list, errors: list) -> list[str]:
+    failures = [f"writer {w} failed: {e}" for w, e in enumerate(errors) if e]
+    if any(t is None for t in totals):
+        # The ledger cannot be reconciled without every writer's totals
+        return failures or ["a writer finished without reporting totals"]
+
+    purchased = sum(t[0] for t in totals)
+    sold = sum(t[1] for t in totals)
+    recorded = sum(t[2] for t in totals)
+    expected = initial_stock + purchased - sold
+
+    catalog_stock = db.get_current_stock(STRESS_SKU)
+    if catalog_stock != expected:
+        failures.append(f"catalog stock {catalog_stock} != expected {expected}")
+
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT sales_qty, purchase_qty, stock_level
+            FROM inventory_sales
+            WHERE sku_id = :sku_id
+            ORDER BY id
+        """), {"sku_id": STRESS_SKU}).fetchall()
+        rolled = conn.execute(text(f"""
+            SELECT COALESCE(SUM(records), 0), COALESCE(SUM(sales_qty), 0), COALESCE(SUM(purchase_qty), 0)
+            FROM {ROLLUP_TABLES["day"]}
+            WHERE sku_id = :sku_id
+        """), {"sku_id": STRESS_SKU}).one()
+
+    ledger = (len(rows), sum(r[0] for r in rows), sum(r[1] for r in rows))
+    if tuple(int(v) for v in rolled) != ledger:
+        failures.append(f"daily rollup (records, sold, purchased) {tuple(rolled)} != ledger {ledger}")
+
+    if len(rows) != recorded + 1:
+        failures.append(f"ledger has {len(rows)} rows, expected {recorded + 1}")
+
+    if not rows:
+        failures.append("ledger has no rows for the stress SKU")
+        return failures
+
+    stock = rows[0][2]
+    for n, (sales_qty, purchase_qty, stock_level) in enumerate(rows[1:], start=1):
+        stock = stock + purchase_qty - sales_qty
+        if stock_level != stock:
+            failures.append(f"ledger row {n}: stock_level {stock_level} != running stock {stock}")
+            break
+        if stock_level < 0:
+            failures.append(f"ledger row {n}: negative stock {stock_level}")
+            break
+    if rows[-1][2] != expected:
+        failures.append(f"latest ledger stock {rows[-1][2]} != expected {expected}")
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel writer stress test for record_transaction.")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--per-writer", type=int, default=200)
+    parser.add_argument("--initial-stock", type=int, default=50)
+    parser.add_argument("--bulk-every", type=int, default=0,
+                        help="Every Nth operation per writer is a 5-line bulk call (0 = never)")
+    parser.add_argument("--keep", action="store_true", help="Leave the stress SKU in place afterwards")
+    args = parser.parse_args()
+
+    seed(args.initial_stock)
+    totals = [None] * args.writers
+    errors = [None] * args.writers
+    barrier = threading.Barrier(args.writers)
+    threads = [
+        threading.Thread(target=writer, args=(w, args.per_writer, args.bulk_every, totals, errors, barrier))
+        for w in range(args.writers)
+    ]
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    failures = verify(args.initial_stock, totals, errors)
+    finished = [t for t in totals if t is not None]
+    recorded = sum(t[2] for t in finished)
+    rejected = sum(t[3] for t in finished)
+    print(f"{len(finished)}/{args.writers} writers: {recorded} recorded, {rejected} rejected "
+          f"in {elapsed:.2f}s ({(recorded + rejected) / elapsed:.0f} ops/s)")
+    print(f"final stock {db.get_current_stock(STRESS_SKU)}")
+
+    if not args.keep:
+        with db.engine.begin() as conn:
+            cleanup(conn)
+
+    if failures:
+        for f in failures:
+            print(f"FAIL: {f}")
+        sys.exit(1)
+    print("OK: stock ledger consistent under concurrent writers")
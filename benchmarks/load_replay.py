@@ -0,0 +1,319 @@
+"""
+Replay dashboard-like traffic against a running API and report latency per endpoint.
+
+    uvicorn main:app --workers 1                          # from backend_api/
+    python load_replay.py --rate 50 --concurrency 32 --duration 60
+    python load_replay.py --rate 0 --concurrency 16       # closed loop: find capacity
+
+Traffic is made of user actions, each issuing the same requests App.js does:
+
+    forecast tab       GET /forecast?sku_id=..&days={7,14,30}
+    history tab        GET /history?sku_id=..&days={7,30,90}
+    replenishment tab  GET /replenishment-settings/{sku} and
+                       GET /replenishment-recommendation?sku_id=..&days=14, together
+    transaction        POST /record-transaction, then GET /skus and the history tab
+    page load          GET /skus
+
+SKUs are taken from /skus and picked with a Zipf-like popularity so a few
+are hot. Transaction quantities are sampled from a generate_data.py ledger
+(--ledger), per SKU where the SKU appears in it, so writes look like the
+real mix of sales and restocks.
+
+With --rate > 0 actions arrive open-loop (Poisson) at that rate, at most
+--concurrency in flight; arrivals that find the backlog full are counted
+as shed rather than silently delayed. With --rate 0, --concurrency virtual
+users run actions back to back, which measures throughput at saturation.
+
+Results (p50/p95/p99, throughput, error rate per endpoint) are printed and
+written as JSON next to the microbenchmark results. 5xx and transport
+failures count as errors; 4xx responses (e.g. a sale rejected for
+insufficient stock) are reported separately.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from run_benchmarks import RESULTS_DIR, environment
+
+DEFAULT_URL = "http://127.0.0.1:8000"
+LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "inventory_sales.csv")
+
+# Relative weight of each user action
+ACTION_MIX = {
+    "forecast_tab": 0.35,
+    "history_tab": 0.25,
+    "replenishment_tab": 0.20,
+    "transaction": 0.15,
+    "page_load": 0.05,
+}
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint, from the end of warmup on."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.recording = False
+        self.started = None
+        self.stopped = None
+        self.shed = 0
+        self.actions = Counter()
+
+    def start(self) -> None:
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording = False
+        self.stopped = time.perf_counter()
+
+    def add(self, endpoint: str, seconds: float, status) -> None:
+        if self.recording:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def report(self) -> dict:
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        endpoints = {}
+        all_latencies = []
+        totals = Counter()
+        for endpoint in sorted(self.latencies):
+            lat = np.array(self.latencies[endpoint]) * 1000
+            statuses = self.statuses[endpoint]
+            count = int(lat.size)
+            errors = sum(n for s, n in statuses.items() if s == "error" or (isinstance(s, int) and s >= 500))
+            client_errors = sum(n for s, n in statuses.items() if isinstance(s, int) and 400 <= s < 500)
+            endpoints[endpoint] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 2),
+                "p50_ms": round(float(np.percentile(lat, 50)), 2),
+                "p95_ms": round(float(np.percentile(lat, 95)), 2),
+                "p99_ms": round(float(np.percentile(lat, 99)), 2),
+                "max_ms": round(float(lat.max()), 2),
+                "error_rate": round(errors / count, 4),
+                "client_error_rate": round(client_errors / count, 4),
+                "statuses": {str(s): n for s, n in sorted(statuses.items(), key=str)},
+            }
+            all_latencies.append(lat)
+            totals["requests"] += count
+            totals["errors"] += errors
+            totals["client_errors"] += client_errors
+
+        lat = np.concatenate(all_latencies) if all_latencies else np.zeros(1)
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "overall": {
+                "requests": totals["requests"],
+                "throughput_rps": round(totals["requests"] / elapsed, 2),
+                "p50_ms": round(float(np.percentile(lat, 50)), 2),
+                "p95_ms": round(float(np.percentile(lat, 95)), 2),
+                "p99_ms": round(float(np.percentile(lat, 99)), 2),
+                "error_rate": round(totals["errors"] / max(totals["requests"], 1), 4),
+                "client_error_rate": round(totals["client_errors"] / max(totals["requests"], 1), 4),
+                "actions": dict(self.actions),
+                "shed_actions": self.shed,
+            },
+            "endpoints": endpoints,
+        }
+
+
+class Replay:
+    """Issues the requests for each user action."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, sku_ids: list[str],
+                 ledger: dict, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.sku_ids = sku_ids
+        self.ledger = ledger
+        self.rng = rng
+        # Zipf-like popularity: the k-th SKU is picked ~1/k^1.1 as often as the first
+        weights = 1 / np.arange(1, len(sku_ids) + 1) ** 1.1
+        self.popularity = list(np.cumsum(weights / weights.sum()))
+
+    def pick_sku(self) -> str:
+        return self.rng.choices(self.sku_ids, cum_weights=self.popularity)[0]
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        self.recorder.add(endpoint, time.perf_counter() - started, status)
+        return response
+
+    async def page_load(self) -> None:
+        await self.request("GET /skus", "GET", "/skus")
+
+    async def forecast_tab(self) -> None:
+        days = self.rng.choice([7, 7, 14, 30])
+        await self.request("GET /forecast", "GET", "/forecast", params={"sku_id": self.pick_sku(), "days": days})
+
+    async def history_tab(self, sku_id: str = None) -> None:
+        days = self.rng.choice([7, 7, 30, 90])
+        await self.request("GET /history", "GET", "/history",
+                           params={"sku_id": sku_id or self.pick_sku(), "days": days})
+
+    async def replenishment_tab(self) -> None:
+        sku_id = self.pick_sku()
+        await asyncio.gather(
+            self.request("GET /replenishment-settings/{sku_id}", "GET", f"/replenishment-settings/{sku_id}"),
+            self.request("GET /replenishment-recommendation", "GET", "/replenishment-recommendation",
+                         params={"sku_id": sku_id, "days": 14}),
+        )
+
+    async def transaction(self) -> None:
+        sku_id = self.pick_sku()
+        rows = self.ledger.get(sku_id) or self.ledger["*"]
+        sales_qty, purchase_qty = rows[self.rng.randrange(len(rows))]
+        response = await self.request("POST /record-transaction", "POST", "/record-transaction", json={
+            "sku_id": sku_id,
+            "sales_qty": sales_qty,
+            "purchase_qty": purchase_qty,
+            "transaction_date": str(date.today()),
+        })
+        # App.js refreshes the SKU list and then shows the history tab
+        if response is not None and response.status_code < 400:
+            await self.page_load()
+            await self.history_tab(sku_id)
+
+    async def action(self, name: str) -> None:
+        self.recorder.actions[name] += self.recorder.recording
+        await getattr(self, name)()
+
+
+def load_ledger(path: str, max_rows: int = 200_000, seed: int = 0) -> dict:
+    """(sales_qty, purchase_qty) pairs per SKU from a generate_data.py ledger, plus '*' for all."""
+    df = pd.read_csv(path, usecols=["sku_id", "sales_qty", "purchase_qty"])
+    if len(df) > max_rows:
+        df = df.sample(max_rows, random_state=seed)
+    df = df[(df["sales_qty"] > 0) | (df["purchase_qty"] > 0)]
+    pairs = list(zip(df["sales_qty"].astype(int), df["purchase_qty"].astype(int)))
+    by_sku = {sku: list(zip(g["sales_qty"].astype(int), g["purchase_qty"].astype(int)))
+              for sku, g in df.groupby("sku_id")}
+    return {**by_sku, "*": pairs}
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        response = await client.get("/skus")
+        response.raise_for_status()
+        sku_ids = [s["sku_id"] for s in response.json()["skus"]]
+        if not sku_ids:
+            raise RuntimeError("The API returned no SKUs")
+        rng.shuffle(sku_ids)
+
+        replay = Replay(client, recorder, sku_ids, load_ledger(args.ledger, seed=args.seed), rng)
+        names = list(ACTION_MIX)
+        weights = [ACTION_MIX[n] for n in names]
+        if args.write_ratio is not None:
+            others = sum(w for n, w in zip(names, weights) if n != "transaction")
+            weights = [args.write_ratio if n == "transaction" else w / others * (1 - args.write_ratio)
+                       for n, w in zip(names, weights)]
+
+        def next_action() -> str:
+            return rng.choices(names, weights=weights)[0]
+
+        end_warmup = time.perf_counter() + args.warmup
+        deadline = end_warmup + args.duration
+        print(f"{len(sku_ids)} SKUs; warming up for {args.warmup}s, then measuring for {args.duration}s ...")
+
+        async def timer():
+            await asyncio.sleep(args.warmup)
+            recorder.start()
+            await asyncio.sleep(args.duration)
+            recorder.stop()
+
+        timer_task = asyncio.create_task(timer())
+
+        if args.rate <= 0:
+            # Closed loop: each virtual user starts its next action when the last one ends
+            async def user():
+                while time.perf_counter() < deadline:
+                    await replay.action(next_action())
+
+            await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        else:
+            # Open loop: Poisson arrivals, at most `concurrency` in flight
+            slots = asyncio.Semaphore(args.concurrency)
+            backlog = 0
+            tasks = set()
+
+            async def admit(name):
+                nonlocal backlog
+                async with slots:
+                    backlog -= 1
+                    await replay.action(name)
+
+            next_at = time.perf_counter()
+            while next_at < deadline:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                if backlog >= args.concurrency * 10:
+                    recorder.shed += recorder.recording
+                else:
+                    backlog += 1
+                    task = asyncio.create_task(admit(next_action()))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                next_at += rng.expovariate(args.rate)
+            if tasks:
+                await asyncio.wait(tasks, timeout=args.timeout)
+
+        await timer_task
+
+    return recorder.report()
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'endpoint':<42}{'reqs':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>8}{'4xx %':>8}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for name, r in rows:
+        print(f"{name:<42}{r['requests']:>8}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{100 * r['error_rate']:>8.2f}{100 * r['client_error_rate']:>8.2f}")
+    if report["overall"]["shed_actions"]:
+        print(f"\n{report['overall']['shed_actions']} actions shed: the server could not keep up with the rate")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay dashboard traffic against the inventory API.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--rate", type=float, default=20.0, help="User actions per second (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max actions in flight / virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds first")
+    parser.add_argument("--write-ratio", type=float, default=None,
+                        help=f"Share of actions that are transactions (default {ACTION_MIX['transaction']})")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help="generate_data.py CSV to sample writes from")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON path (default: results/load-<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    env = environment()
+    report = {"environment": env, "settings": {k: v for k, v in vars(args).items() if k != "output"},
+              **asyncio.run(run(args))}
+    print_report(report)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"load-{stamp}-{env['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
@@ -0,0 +1,392 @@
+"""
+Microbenchmarks for the forecasting, replenishment and database hot paths.
+
+    python run_benchmarks.py                                # everything except db
+    python run_benchmarks.py --groups db --db-skus 2000 --db-days 730
+    python run_benchmarks.py --compare results/<earlier>.json
+
+Groups:
+    features       build_features / future_features at several horizons
+    predict        model.predict on a per-SKU forest at several horizons
+    replenishment  calculate_recommendation and calculate_fleet_recommendations,
+                   after checking that the two agree SKU by SKU
+    model_load     artifact load time, plain and memory-mapped
+    db             every db.py query against Postgres (DB_URL), in a separate
+                   "bench" schema seeded with generate_data at --db-skus x --db-days
+
+Each benchmark is calibrated so one sample takes at least --min-time, then
+sampled --repeat times with GC disabled (like timeit); the report gives
+per-call min / median / mean / p95 and ops/s. Peak Python-side allocation
+(tracemalloc, which also sees NumPy buffers) is measured in a separate,
+untimed call. Results are written as JSON with the git commit and library
+versions, and --compare prints the change in median against an earlier run,
+exiting 1 if anything slowed down by more than --threshold.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend_api"))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+from features import build_features, date_range, future_features  # noqa: E402
+from replenishment import ReplenishmentRecommendationEngine  # noqa: E402
+from train import make_model  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+HORIZONS = [1, 7, 14, 30, 90, 365]
+BENCH_SCHEMA = "bench"
+
+
+# ── Harness ─────────────────────────────────────────────────────
+
+def measure(fn, repeat: int = 20, min_time: float = 0.01, warmup: int = 2) -> dict:
+    """
+    Time `fn()` and measure its peak allocation.
+
+    Args:
+        fn: Zero-argument callable to benchmark
+        repeat: Number of timed samples
+        min_time: Minimum seconds per sample; fast calls are looped
+        warmup: Untimed calls before calibration
+
+    Returns:
+        Per-call timings in microseconds plus peak_alloc_bytes
+    """
+    for _ in range(warmup):
+        fn()
+
+    # Calibrate loops per sample by doubling
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    us = sorted(s * 1e6 for s in samples)
+    median = statistics.median(us)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_us": round(us[0], 3),
+        "median_us": round(median, 3),
+        "mean_us": round(statistics.fmean(us), 3),
+        "p95_us": round(us[min(len(us) - 1, int(0.95 * len(us)))], 3),
+        "stdev_us": round(statistics.stdev(us), 3) if len(us) > 1 else 0.0,
+        "ops_per_sec": round(1e6 / median, 1) if median else None,
+        "peak_alloc_bytes": peak,
+    }
+
+
+class Suite:
+    """Collects named results and prints them as they come in."""
+
+    def __init__(self, repeat: int, min_time: float):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.results = {}
+
+    def run(self, name: str, fn, **params) -> None:
+        result = measure(fn, repeat=self.repeat, min_time=self.min_time)
+        self.results[name] = {**params, **result}
+        print(f"  {name:<48} {result['median_us']:>12.1f} µs  "
+              f"(p95 {result['p95_us']:.1f}, peak {result['peak_alloc_bytes'] / 1024:.0f} KiB)")
+
+
+# ── Groups ──────────────────────────────────────────────────────
+
+def synthetic_history(days: int = 730, seed: int = 42) -> tuple:
+    """One SKU's worth of history shaped like generate_data.py output."""
+    rng = np.random.default_rng(seed)
+    dates = date_range(date(2023, 1, 1), days)
+    X = build_features(dates)
+    base = 30 * np.where(X[:, 4] == 1, 0.7, 1.0) * (1 + 0.3 * np.sin(X[:, 3] / 58))
+    y = np.maximum(1, np.rint(base + rng.normal(0, 4, days))).astype(np.int32)
+    return dates, y
+
+
+def bench_features(suite: Suite) -> None:
+    today = date.today()
+    for days in HORIZONS:
+        suite.run(f"features.future_features[{days}]", lambda d=days: future_features(today, d), days=days)
+    dates = date_range(date(2020, 1, 1), 3 * 365)
+    suite.run("features.build_features[3y history]", lambda: build_features(dates), rows=len(dates))
+
+
+def bench_predict(suite: Suite, model) -> None:
+    today = date.today()
+    for days in HORIZONS:
+        X = future_features(today, days)
+        suite.run(f"predict.model_predict[{days}]", lambda X=X: model.predict(X), days=days)
+    suite.run("predict.features_and_predict[14]",
+              lambda: np.maximum(model.predict(future_features(today, 14)), 0.0), days=14)
+
+
+def bench_replenishment(suite: Suite, skus: int = 1000) -> None:
+    rng = np.random.default_rng(7)
+    demand = list(rng.uniform(5, 50, 21))
+    args = dict(current_stock=300, lead_time_days=7, min_order_qty=10,
+                reorder_point=50, safety_stock=25, target_stock_level=150)
+    suite.run("replenishment.calculate_recommendation",
+              lambda: ReplenishmentRecommendationEngine.calculate_recommendation(
+                  forecasted_demand_days=demand, **args))
+
+    fleet = dict(
+        current_stock=rng.integers(0, 800, skus),
+        forecasted_demand=rng.uniform(5, 50, (skus, 21)),
+        lead_time_days=rng.integers(1, 14, skus),
+        min_order_qty=rng.integers(1, 50, skus),
+        reorder_point=rng.integers(20, 100, skus),
+        safety_stock=rng.integers(0, 20, skus),
+        target_stock_level=rng.integers(100, 400, skus),
+    )
+    check_fleet_matches_scalar(fleet)
+    suite.run(f"replenishment.calculate_fleet_recommendations[{skus}]",
+              lambda: ReplenishmentRecommendationEngine.calculate_fleet_recommendations(**fleet), skus=skus)
+
+
+def check_fleet_matches_scalar(fleet: dict) -> None:
+    """Raise if any SKU's fleet recommendation differs from calculate_recommendation's."""
+    result = ReplenishmentRecommendationEngine.calculate_fleet_recommendations(**fleet)
+    for i in range(len(fleet["current_stock"])):
+        scalar = ReplenishmentRecommendationEngine.calculate_recommendation(
+            current_stock=int(fleet["current_stock"][i]),
+            forecasted_demand_days=list(fleet["forecasted_demand"][i]),
+            **{k: int(fleet[k][i]) for k in ("lead_time_days", "min_order_qty", "reorder_point",
+                                             "safety_stock", "target_stock_level")},
+        )
+        row = ReplenishmentRecommendationEngine.fleet_recommendation(result, i)
+        if row != scalar:
+            diff = {k: (row[k], scalar[k]) for k in scalar if row.get(k) != scalar[k]}
+            raise AssertionError(f"fleet and scalar recommendations differ for SKU {i}: {diff}")
+
+
+def bench_model_load(suite: Suite, path: str) -> None:
+    size = os.path.getsize(path)
+    suite.run("model_load.joblib_load", lambda: joblib.load(path), artifact_bytes=size)
+    suite.run("model_load.joblib_load_mmap", lambda: joblib.load(path, mmap_mode="r"), artifact_bytes=size)
+
+
+def seed_bench_schema(url: str, skus: int, days: int, reseed: bool = False):
+    """
+    Return an engine whose search_path is the bench schema, seeded at the given scale.
+
+    The schema is migrated and filled with generate_data + bulk_load, and
+    only reseeded when the existing catalog does not match the scale.
+    """
+    from sqlalchemy import create_engine, text
+
+    import generate_data
+    from bulk_load import bulk_load
+    from migrations import apply_migrations
+
+    with create_engine(url).begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}"))
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={BENCH_SCHEMA}"}, pool_size=5)
+    apply_migrations(engine)
+
+    with engine.connect() as conn:
+        have = conn.execute(text("SELECT COUNT(*), COALESCE(SUM(total_records), 0) FROM sku_catalog")).one()
+    if reseed or tuple(have) != (skus, skus * days):
+        print(f"  seeding {BENCH_SCHEMA} schema with {skus} SKUs x {days} days ...")
+        rng = np.random.default_rng(42)
+        profiles = generate_data.random_profiles(skus, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ledger.csv")
+            generate_data.write(generate_data.generate(profiles, date(2023, 1, 1), days, rng), path)
+            bulk_load(engine, path, workers=2)
+    return engine
+
+
+def bench_db(suite: Suite, url: str, skus: int, days: int, reseed: bool) -> None:
+    from sqlalchemy import text
+
+    import db
+
+    engine = seed_bench_schema(url, skus, days, reseed)
+    with engine.connect() as conn:
+        sku_ids = [r[0] for r in conn.execute(text("SELECT sku_id FROM sku_catalog ORDER BY sku_id"))]
+        last_day = conn.execute(text("SELECT MAX(sale_date) FROM inventory_sales")).scalar()
+    sku = sku_ids[len(sku_ids) // 2]
+    some = sku_ids[:: max(1, len(sku_ids) // 100)][:100]
+    scale = {"db_skus": skus, "db_days": days}
+
+    def read(fn, *args):
+        def call():
+            with engine.connect() as conn:
+                return fn(*args, conn=conn)
+        return call
+
+    def write(fn, *args):
+        # Rolled back, so repeated runs do not change the seeded data
+        def call():
+            with engine.connect() as conn:
+                tx = conn.begin()
+                try:
+                    return fn(*args, conn=conn)
+                finally:
+                    tx.rollback()
+        return call
+
+    suite.run("db.get_all_skus", read(db.get_all_skus), **scale)
+    for n in (7, 90, 365):
+        suite.run(f"db.get_history[{n}]", read(db.get_history, sku, n), **scale)
+    suite.run("db.get_history_page[week,52]", read(db.get_history_page, sku, 52, "week"), **scale)
+    suite.run("db.get_history_page[month,36]", read(db.get_history_page, sku, 36, "month"), **scale)
+    suite.run("db.get_current_stock", read(db.get_current_stock, sku), **scale)
+    suite.run("db.get_current_stocks[all]", read(db.get_current_stocks, None), **scale)
+    suite.run(f"db.get_current_stocks[{len(some)}]", read(db.get_current_stocks, some), **scale)
+    suite.run("db.get_replenishment_settings", read(db.get_replenishment_settings, sku), **scale)
+    suite.run("db.get_all_replenishment_settings[all]", read(db.get_all_replenishment_settings, sku_ids), **scale)
+
+    txn_date = str(last_day)
+    suite.run("db.record_transaction", write(db.record_transaction, sku, 1, 0, txn_date), **scale)
+    lines = [{"sku_id": s, "sales_qty": 1, "purchase_qty": 0, "transaction_date": txn_date} for s in some]
+    suite.run(f"db.record_transactions_bulk[{len(lines)}]", write(db.record_transactions_bulk, lines), **scale)
+    settings = {"lead_time_days": 7, "min_order_qty": 10, "reorder_point": 50,
+                "safety_stock": 25, "target_stock_level": 150}
+    suite.run("db.set_replenishment_settings", write(db.set_replenishment_settings, sku, settings), **scale)
+    engine.dispose()
+
+
+# ── Reporting ───────────────────────────────────────────────────
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print median changes against a baseline run; return the regressed benchmark names."""
+    regressions = []
+    print(f"\nvs {baseline['environment'].get('commit')} ({baseline['environment'].get('created_at')})")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median_us"] / before["median_us"] if before["median_us"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"  {name:<48} {before['median_us']:>12.1f} → {result['median_us']:>12.1f} µs  x{ratio:.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the microbenchmark suite.")
+    parser.add_argument("--groups", nargs="+", default=["features", "predict", "replenishment", "model_load"],
+                        choices=["features", "predict", "replenishment", "model_load", "db"])
+    parser.add_argument("--repeat", type=int, default=20, help="Timed samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.01, help="Minimum seconds per sample")
+    parser.add_argument("--db-skus", type=int, default=1000, help="SKUs seeded into the bench schema")
+    parser.add_argument("--db-days", type=int, default=365, help="Days of history per seeded SKU")
+    parser.add_argument("--reseed", action="store_true", help="Reseed the bench schema even if it matches")
+    parser.add_argument("--output", default=None, help="JSON path (default: results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="Median ratio that counts as a regression")
+    args = parser.parse_args()
+
+    suite = Suite(repeat=args.repeat, min_time=args.min_time)
+    env = environment()
+    print(f"commit {env['commit']}, python {env['python']}, numpy {env['numpy']}, sklearn {env['sklearn']}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = artifact = None
+        if {"predict", "model_load"} & set(args.groups):
+            # A production-shaped forest (train.make_model) on two years of synthetic history
+            dates, y = synthetic_history()
+            model = make_model().fit(build_features(dates), y)
+            artifact = os.path.join(tmp, "SKU-BENCH.joblib")
+            joblib.dump(model, artifact)
+
+        for group in args.groups:
+            print(f"\n[{group}]")
+            if group == "features":
+                bench_features(suite)
+            elif group == "predict":
+                bench_predict(suite, joblib.load(artifact, mmap_mode="r"))
+            elif group == "replenishment":
+                bench_replenishment(suite)
+            elif group == "model_load":
+                bench_model_load(suite, artifact)
+            elif group == "db":
+                from dotenv import load_dotenv
+
+                load_dotenv()
+                url = os.getenv("DB_URL")
+                if not url:
+                    raise ValueError("DB_URL not found in environment variables")
+                bench_db(suite, url, args.db_skus, args.db_days, args.reseed)
+
+    report = {
+        "environment": env,
+        "settings": {"repeat": args.repeat, "min_time": args.min_time, "groups": args.groups},
+        "results": suite.results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{env['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over x{args.threshold:.2f}")
+            sys.exit(1)